@@ -0,0 +1,83 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare CJKSentenceSplitter with SpacySplitter on the same input.
+
+    python bench_splitters.py --file xxx.txt --pipeline zh_core_web_sm
+
+Without --file, a Chinese text is generated.
+"""
+
+import argparse
+import time
+
+from kubeagi_core.document_chunks.sentence_splitter import CJKSentenceSplitter
+from kubeagi_core.document_chunks.spacy_splitter import SpacySplitter
+from langchain_core.documents import Document
+
+TEXT = (
+    "大语言模型（LLM）是指使用大量文本数据训练的深度学习模型，"
+    "可以生成自然语言文本或理解语言文本的含义。"
+    "大语言模型可以处理多种自然语言任务，如文本分类、问答、对话等，"
+    "是通向人工智能的一条重要途径！它真的有用吗？"
+    "“当然。”他回答道。\n\n"
+)
+
+
+def bench(name, make_splitter, documents):
+    start = time.perf_counter()
+    splitter = make_splitter()
+    chunks = splitter.split_documents(documents)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>12}: {elapsed:8.3f}s (including loading), {len(chunks)} chunks")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--file", default=None)
+    parser.add_argument("--pipeline", default="zh_core_web_sm")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as file:
+            documents = [Document(page_content=file.read(), metadata={"page": 0})]
+    else:
+        documents = [
+            Document(page_content=TEXT * 20, metadata={"page": page})
+            for page in range(args.pages)
+        ]
+    print(f">>> {sum(len(d.page_content) for d in documents)} characters")
+
+    rule_elapsed = bench(
+        "rule based",
+        lambda: CJKSentenceSplitter(
+            chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+        ),
+        documents,
+    )
+    spacy_elapsed = bench(
+        args.pipeline,
+        lambda: SpacySplitter(
+            pipeline=args.pipeline,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+        ),
+        documents,
+    )
+    print(f"<<< speedup: {spacy_elapsed / rule_elapsed:.1f}x")
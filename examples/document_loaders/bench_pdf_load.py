@@ -0,0 +1,47 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare the serial and the parallel text extraction of a pdf file.
+
+    python bench_pdf_load.py --file xxx.pdf --num-workers 8
+"""
+
+import argparse
+import time
+
+from kubeagi_core.document_loaders import PDFLoader
+
+
+def bench(name, loader):
+    start = time.perf_counter()
+    documents = loader.load()
+    elapsed = time.perf_counter() - start
+    print(f"{name:>12}: {elapsed:8.3f}s, {len(documents)} pages")
+    return elapsed, documents
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--file", required=True)
+    parser.add_argument("--num-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    serial_elapsed, serial = bench("serial", PDFLoader(file_path=args.file))
+    parallel_elapsed, parallel = bench(
+        f"{args.num_workers} workers",
+        PDFLoader(file_path=args.file, num_workers=args.num_workers),
+    )
+    same = [d.page_content for d in serial] == [d.page_content for d in parallel]
+    print(f"<<< speedup: {serial_elapsed / parallel_elapsed:.1f}x, same text: {same}")
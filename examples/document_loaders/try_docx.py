@@ -24,5 +24,14 @@ def test_load_docx():
     print(f"document: {document}")
 
 
+def test_load_docx_sections():
+    print(">>> Starting load docx by sections")
+    loader = DocxLoader(file_path="xxx.docx", mode="sections")
+
+    for document in loader.lazy_load():
+        print(f"{document.metadata['headings']}: {len(document.page_content)} chars")
+    print("<<< Finished")
+
+
 if __name__ == "__main__":
     test_load_docx()
@@ -24,13 +24,34 @@ def test_load_pdf():
     print(f"document: {document}")
 
 
+def test_lazy_load_pdf():
+    print(">>> Starting lazy load pdf")
+    pdf_loader = PDFLoader(file_path="xxx.pdf")
+
+    for document in pdf_loader.lazy_load():
+        print(f"page {document.metadata['page']}: {len(document.page_content)} chars")
+    print("<<< Finished")
+
+
+def test_load_pdf_without_headers_footers():
+    print(">>> Starting load pdf without headers and footers")
+    pdf_loader = PDFLoader(file_path="xxx.pdf", strip_headers_footers=True)
+
+    document = pdf_loader.load()
+    print("<<< Finished")
+    print(f"document: {document}")
+
+
 def test_extract_images(file_path, output_dir):
     print(">>> Starting extract images for pdf")
     pdf_loader = PDFLoader(file_path=file_path)
 
-    loader.extract_images(output_dir=output_dir, remove_small_images=True)
+    result = pdf_loader.extract_images(
+        output_dir=output_dir, remove_small_images=True, num_workers=4
+    )
     print("<<< Finished")
     print(f"images output dir: {output_dir}")
+    print(f"result: {result}")
 
 
 if __name__ == "__main__":
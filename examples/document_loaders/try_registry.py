@@ -0,0 +1,29 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from kubeagi_core.document_loaders import get_loader, supported_extensions
+
+
+def test_load_by_file_type(file_path):
+    print(f">>> Starting load {file_path}, supported: {supported_extensions()}")
+    loader = get_loader(file_path)
+
+    for document in loader.lazy_load():
+        print(f"{document.metadata}: {len(document.page_content)} chars")
+    print("<<< Finished")
+
+
+if __name__ == "__main__":
+    test_load_by_file_type("xxx.md")
+    test_load_by_file_type("xxx.html")
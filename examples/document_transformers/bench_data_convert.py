@@ -0,0 +1,135 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Microbenchmark of the DataConvert regex cleaners.
+
+Compares the precompiled single-pass cleaners with the previous
+search-then-sub implementation on a generated Chinese corpus:
+
+    python bench_data_convert.py --size-mb 100
+"""
+
+import argparse
+import random
+import re
+import time
+
+from kubeagi_core.document_transformers.transform import DataConvert
+
+SENTENCES = [
+    "大语言模型（LLM）是指使用大量文本数据训练的深度学习模型，可以生成自然语言文本或理解语言文本的含义。",
+    "如果需要可以联系官方邮箱:172817631@qq.com马上申请为你开通。",
+    "服务器登陆ip为192.168.255.255，请勿外传。",
+    "手机号为18672615192，工作日可以拨打。",
+    "身份证号1：123451230112121234, 身份证号2：12345123011212123x。",
+    "你的wx：qw123，加微信号:abc456备注来源。",
+    "银行卡号1：1234567890123456，银行卡号2：1234567890123456789。",
+    "一户一表、水表出户、抄表到户是供水改造的基本要求。",
+]
+
+# the previous implementation: raw pattern strings, search then sub,
+# and one full pass per weixin / id card pattern.
+LEGACY_PATTERNS = {
+    "email": r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
+    "ip": "".join(
+        [
+            r"((?:(?:1[0-9][0-9]\.)|(?:2[0-4][0-9]\.)|",
+            r"(?:25[0-5]\.)|(?:[1-9][0-9]\.)|(?:[0-9]\.))",
+            r"{3}(?:(?:1[0-9][0-9])|(?:2[0-4][0-9])|",
+            r"(?:25[0-5])|(?:[1-9][0-9])|(?:[0-9]))|",
+            r"([\da-fA-F]{1,4}:){7}[\da-fA-F]{1,4})",
+        ]
+    ),
+    "phone": r"((\+|00)86)?(1)((3[\d])|(4[5,6,7,9])|(5[0-3,5-9])|(6[5-7])|(7[0-8])|(8[\d])|(9[1,8,9]))(\d{8})(?![0-9])",
+    "bank_card": r"\b([1-9]{1})(\d{15}|\d{18})(?![0-9])",
+}
+LEGACY_ID_CARD_PATTERNS = [
+    r"\b([1-9]\d{5}[1-9]\d{3})((0\d)|(1[0-2]))(([0|1|2]\d)|(3[0-1]))(\d{3}[0-9Xx])(?![0-9])",
+    r"\b([1-9]\d{7})((0\d)|(1[0-2]))(([0-2][1-9])|(3[0-1]))(\d{2}[0-9Xx])(?![0-9])",
+]
+LEGACY_WEIXIN_PATTERNS = [
+    rf"{prefix}[：|:][a-zA-Z0-9{{3,20}}]+"
+    for prefix in [
+        "vxin",
+        "vx",
+        "VX",
+        "Vxin",
+        "wx",
+        "WX",
+        "wei xin",
+        "weixin",
+        "微信",
+        "微信号",
+        "薇信",
+        "薇信号",
+        "v信",
+        "V信",
+    ]
+]
+
+
+def legacy_clean(text, repl="xxxx"):
+    for pattern in LEGACY_PATTERNS.values():
+        if re.search(pattern, text, flags=re.DOTALL):
+            text = re.sub(pattern=pattern, repl=repl, string=text, flags=re.DOTALL)
+    for pattern in LEGACY_ID_CARD_PATTERNS + LEGACY_WEIXIN_PATTERNS:
+        text = re.sub(pattern=pattern, repl=repl, string=text, flags=re.DOTALL)
+    return text
+
+
+def clean(text, repl="xxxx"):
+    data_convert = DataConvert()
+    text = data_convert.email_convert(text=text, repl=repl)
+    text = data_convert.ip_convert(text=text, repl=repl)
+    text = data_convert.phone_convert(text=text, repl=repl)
+    text = data_convert.bank_card_convert(text=text, repl=repl)
+    text = data_convert.id_card_convert(text=text, repl=repl)
+    text = data_convert.weixin_convert(text=text, repl=repl)
+    return text
+
+
+def make_corpus(size_mb, chunk_size=500):
+    """Generate chunks of about `chunk_size` characters until `size_mb` is reached."""
+    rng = random.Random(0)
+    chunks = []
+    total = 0
+    while total < size_mb * 1024 * 1024:
+        chunk = ""
+        while len(chunk) < chunk_size:
+            chunk += rng.choice(SENTENCES)
+        chunks.append(chunk)
+        total += len(chunk.encode("utf-8"))
+    return chunks
+
+
+def bench(name, fn, chunks):
+    start = time.perf_counter()
+    result = [fn(chunk) for chunk in chunks]
+    elapsed = time.perf_counter() - start
+    print(f"{name:>8}: {elapsed:8.2f}s")
+    return result, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=100)
+    args = parser.parse_args()
+
+    chunks = make_corpus(args.size_mb)
+    print(f">>> {len(chunks)} chunks, {args.size_mb} MB")
+    legacy_result, legacy_elapsed = bench("legacy", legacy_clean, chunks)
+    result, elapsed = bench("compiled", clean, chunks)
+    assert result == legacy_result, "the cleaned texts are different"
+    print(f"<<< speedup: {legacy_elapsed / elapsed:.2f}x")
@@ -0,0 +1,82 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per-chunk cost of DataConvert.emojis_convert.
+
+Compares the cached trie pattern with the previous implementation, which
+joined all the emojis into a new pattern on every call:
+
+    python bench_emojis_convert.py --chunks 2000
+"""
+
+import argparse
+import random
+import re
+import time
+
+import emoji
+from kubeagi_core.document_transformers.transform import DataConvert
+
+TEXT = "这是一段带有表情符号的文本，大语言模型可以生成自然语言文本或理解语言文本的含义。"
+
+
+def legacy_emojis_convert(text, repl="", purge=False):
+    if purge:
+        # what happens once other patterns evicted it from the re cache
+        re.purge()
+    emojis = list(emoji.EMOJI_DATA.keys())
+    pattern = "|".join(re.escape(value) for value in emojis)
+    if not re.search(pattern, text, flags=re.DOTALL):
+        return text
+    return re.sub(pattern=pattern, repl=repl, string=text, flags=re.DOTALL)
+
+
+def make_chunks(count, chunk_size=500):
+    rng = random.Random(0)
+    emojis = list(emoji.EMOJI_DATA.keys())
+    chunks = []
+    for _ in range(count):
+        chunk = ""
+        while len(chunk) < chunk_size:
+            chunk += TEXT + rng.choice(emojis)
+        chunks.append(chunk)
+    return chunks
+
+
+def bench(name, fn, chunks):
+    start = time.perf_counter()
+    for chunk in chunks:
+        fn(chunk)
+    per_chunk = (time.perf_counter() - start) / len(chunks) * 1000
+    print(f"{name:>14}: {per_chunk:8.3f} ms/chunk")
+    return per_chunk
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=2000)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks)
+    data_convert = DataConvert()
+    print(f">>> {len(chunks)} chunks")
+    bench("legacy", legacy_emojis_convert, chunks)
+    bench(
+        "legacy (purge)",
+        lambda chunk: legacy_emojis_convert(chunk, purge=True),
+        chunks[: max(1, len(chunks) // 100)],
+    )
+    bench("cached trie", data_convert.emojis_convert, chunks)
+    print("<<< Finished")
@@ -13,7 +13,10 @@
 # limitations under the License.
 
 
+from kubeagi_core.document_transformers.dedup import ChunkDeduplicator
+from kubeagi_core.document_transformers.pipeline import CleaningPipeline
 from kubeagi_core.document_transformers.transform import Clean, DataConvert, FixUnicode
+from langchain_core.documents import Document
 
 
 def test_traditional_to_simplified():
@@ -134,3 +137,40 @@ def test_space_convert():
     clean_text = data_convert.space_convert(text=text, repl=" ")
     print("<<< Finished")
     print(f"clean text: {clean_text}")
+
+
+def test_cleaning_pipeline():
+    print(">>> Starting cleaning pipeline")
+    texts = [
+        "風暴帶來的暫停使消防員得以進入禁區😊",
+        "如果需要可以联系官方邮箱:172817631@qq.com，手机号为18672615192",
+    ]
+    pipeline = CleaningPipeline(
+        [
+            {"type": "chinese_convert"},
+            {"type": "remove_emojis"},
+            {"type": "remove_email", "repl": "<EMAIL>"},
+            {"type": "remove_phone", "repl": "<PHONE>"},
+        ]
+    )
+
+    clean_texts = pipeline.apply_many(texts)
+    print("<<< Finished")
+    print(f"clean texts: {clean_texts}")
+
+
+def test_chunk_dedup():
+    print(">>> Starting chunk dedup")
+    text = "大语言模型（LLM）是指使用大量文本数据训练的深度学习模型，可以生成自然语言文本或理解语言文本的含义。"
+    documents = [
+        Document(page_content=text),
+        Document(page_content=text + "\n"),
+        Document(page_content=text.replace("LLM", "llm")),
+        Document(page_content="大语言模型可以处理多种自然语言任务，如文本分类、问答、对话等。"),
+    ]
+    deduplicator = ChunkDeduplicator(threshold=0.7)
+
+    kept = deduplicator.deduplicate(documents)
+    print("<<< Finished")
+    print(f"kept chunks: {[document.page_content for document in kept]}")
+    print(f"dedup stats: {deduplicator.stats()}")
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+
 from kubeagi_core.qa_provider.openai import QAProviderOpenAI
 
 
@@ -33,5 +35,53 @@ def test_qa_provider_by_open_ai():
     print(f"QA data: {data}")
 
 
+def test_async_qa_provider_by_open_ai():
+    print(">>> Starting generate qa by open ai asynchronously")
+    qa_provider = QAProviderOpenAI(
+        api_key="fake",
+        base_url="http://fastchat-api.172.22.96.167.nip.io/v1",
+        model="f8e35823-3841-4253-ae79-0fff47917fb3",
+        temperature=0.8,
+        max_tokens=512,
+        max_connections=16,
+    )
+    texts = [
+        "大语言模型（LLM）是指使用大量文本数据训练的深度学习模型，可以生成自然语言文本或理解语言文本的含义。",
+        "大语言模型可以处理多种自然语言任务，如文本分类、问答、对话等，是通向人工智能的一条重要途径。",
+    ]
+
+    async def generate_all():
+        # all the requests are in flight at the same time on one event loop
+        return await asyncio.gather(
+            *[qa_provider.agenerate_qa_list(text=text) for text in texts]
+        )
+
+    data = asyncio.run(generate_all())
+
+    print("<<< Finished")
+    print(f"QA data: {data}")
+
+
+def test_packed_qa_provider_by_open_ai():
+    print(">>> Starting generate qa of packed texts by open ai")
+    qa_provider = QAProviderOpenAI(
+        api_key="fake",
+        base_url="http://fastchat-api.172.22.96.167.nip.io/v1",
+        model="f8e35823-3841-4253-ae79-0fff47917fb3",
+        temperature=0.8,
+        max_tokens=1024,
+    )
+    texts = [
+        "大语言模型（LLM）是指使用大量文本数据训练的深度学习模型，可以生成自然语言文本或理解语言文本的含义。",
+        "大语言模型可以处理多种自然语言任务，如文本分类、问答、对话等，是通向人工智能的一条重要途径。",
+    ]
+
+    # one request for both texts, the data holds the QA list of each text
+    data = qa_provider.generate_packed_qa_lists(texts=texts)
+
+    print("<<< Finished")
+    print(f"QA data: {data}")
+
+
 if __name__ == "__main__":
     test_qa_provider_by_open_ai()
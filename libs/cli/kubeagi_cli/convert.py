@@ -51,6 +51,21 @@ def pdf(
         int,
         typer.Option(help="text chunk overlap"),
     ] = 50,
+    dedup_threshold: Annotated[
+        float,
+        typer.Option(
+            help="drop the chunks at least this similar to an earlier one, "
+            "e.g. 0.9, no dedup if not set"
+        ),
+    ] = None,
+    strip_headers_footers: Annotated[
+        bool,
+        typer.Option(help="remove the running headers, footers and page numbers"),
+    ] = False,
+    num_workers: Annotated[
+        int,
+        typer.Option(help="number of processes to extract the text of the pages"),
+    ] = 1,
 ):
     import ujson
     from kubeagi_core.document_transformers.pdf2csv import PDF2CSVTransform
@@ -68,6 +83,192 @@ def pdf(
         output_dir=output_dir,
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
+        dedup_config=_dedup_config(dedup_threshold),
+        strip_headers_footers=strip_headers_footers,
+        num_workers=num_workers,
     )
 
     return pdf_transformer.transform()
+
+
+@convert_cli.command(name="file")
+def document(
+    file_path: Annotated[
+        str,
+        typer.Argument(
+            help="file path, the file type is detected by the extension",
+        ),
+    ] = None,
+    llm_config: Annotated[
+        str,
+        typer.Argument(
+            help="llm config for generate qa",
+        ),
+    ] = None,
+    data_cleaning_config: Annotated[
+        List[str],
+        typer.Option(help="data cleaning config"),
+    ] = [],
+    loader_config: Annotated[
+        str,
+        typer.Option(help='loader config of the file type, e.g. {"mode": "sections"}'),
+    ] = None,
+    output_dir: Annotated[
+        str,
+        typer.Option(help="file output path"),
+    ] = None,
+    chunk_size: Annotated[
+        int,
+        typer.Option(help="text chunk size"),
+    ] = 500,
+    chunk_overlap: Annotated[
+        int,
+        typer.Option(help="text chunk overlap"),
+    ] = 50,
+    dedup_threshold: Annotated[
+        float,
+        typer.Option(
+            help="drop the chunks at least this similar to an earlier one, "
+            "e.g. 0.9, no dedup if not set"
+        ),
+    ] = None,
+    strip_headers_footers: Annotated[
+        bool,
+        typer.Option(
+            help="remove the running headers, footers and page numbers of the pdf files"
+        ),
+    ] = False,
+):
+    """
+    convert a pdf, docx, txt, markdown or html file to csv.
+    """
+    from pathlib import Path
+
+    import ujson
+    from kubeagi_core.document_transformers.document2csv import (
+        Document2CSVTransform,
+    )
+
+    if len(data_cleaning_config) > 0:
+        data_cleaning_config = [ujson.loads(s) for s in data_cleaning_config]
+    loader_config = ujson.loads(loader_config) if loader_config else {}
+    if strip_headers_footers and Path(file_path).suffix.lower() == ".pdf":
+        loader_config["strip_headers_footers"] = True
+
+    document_transformer = Document2CSVTransform(
+        file_path=file_path,
+        llm_config=ujson.loads(llm_config),
+        data_cleaning_config=data_cleaning_config,
+        output_dir=output_dir,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        dedup_config=_dedup_config(dedup_threshold),
+        loader_config=loader_config,
+    )
+
+    return document_transformer.transform()
+
+
+@convert_cli.command(name="dir")
+def directory(
+    input_dir: Annotated[
+        str,
+        typer.Argument(
+            help="directory of the files to convert",
+        ),
+    ] = None,
+    llm_config: Annotated[
+        str,
+        typer.Argument(
+            help="llm config for generate qa",
+        ),
+    ] = None,
+    pattern: Annotated[
+        List[str],
+        typer.Option(help="glob pattern of the files to convert"),
+    ] = ["*.pdf", "*.docx", "*.txt", "*.md", "*.html"],
+    recursive: Annotated[
+        bool,
+        typer.Option(help="also convert the files in the sub directories"),
+    ] = False,
+    data_cleaning_config: Annotated[
+        List[str],
+        typer.Option(help="data cleaning config"),
+    ] = [],
+    output_dir: Annotated[
+        str,
+        typer.Option(help="file output path"),
+    ] = None,
+    chunk_size: Annotated[
+        int,
+        typer.Option(help="text chunk size"),
+    ] = 500,
+    chunk_overlap: Annotated[
+        int,
+        typer.Option(help="text chunk overlap"),
+    ] = 50,
+    num_workers: Annotated[
+        int,
+        typer.Option(help="number of processes to load the files"),
+    ] = None,
+    dedup_threshold: Annotated[
+        float,
+        typer.Option(
+            help="drop the chunks at least this similar to an earlier one, "
+            "e.g. 0.9, no dedup if not set"
+        ),
+    ] = None,
+    strip_headers_footers: Annotated[
+        bool,
+        typer.Option(
+            help="remove the running headers, footers and page numbers of the pdf files"
+        ),
+    ] = False,
+):
+    """
+    convert all the files in a directory to csv, one csv file per file,
+    named after the whole file name, e.g. report.pdf.csv and report.docx.csv.
+    """
+    from pathlib import Path
+
+    import ujson
+    from kubeagi_core.document_transformers.batch import Batch2CSVTransform
+
+    if len(data_cleaning_config) > 0:
+        data_cleaning_config = [ujson.loads(s) for s in data_cleaning_config]
+
+    file_paths = set()
+    for file_pattern in pattern:
+        if recursive:
+            file_paths.update(Path(input_dir).rglob(file_pattern))
+        else:
+            file_paths.update(Path(input_dir).glob(file_pattern))
+    file_paths = sorted(str(path) for path in file_paths if path.is_file())
+    if len(file_paths) == 0:
+        print(f"no file matches {pattern} in {input_dir}")
+        raise typer.Exit(code=1)
+
+    batch_transformer = Batch2CSVTransform(
+        file_paths=file_paths,
+        llm_config=ujson.loads(llm_config),
+        data_cleaning_config=data_cleaning_config,
+        output_dir=output_dir,
+        input_dir=input_dir,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        num_workers=num_workers,
+        dedup_config=_dedup_config(dedup_threshold),
+        loader_configs=(
+            {".pdf": {"strip_headers_footers": True}} if strip_headers_footers else None
+        ),
+    )
+
+    res = batch_transformer.transform()
+    print(res.get("message") or f"converted {len(file_paths)} files")
+    return res
+
+
+def _dedup_config(dedup_threshold):
+    if dedup_threshold is None:
+        return None
+    return {"threshold": dedup_threshold}
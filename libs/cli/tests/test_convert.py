@@ -0,0 +1,68 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import json
+
+from kubeagi_cli.convert import convert_cli
+from kubeagi_core.document_transformers import batch, document2csv
+from typer.testing import CliRunner
+
+
+class FakeQAProvider:
+    def generate_qa_list(self, text, **kwargs):
+        return {"status": 200, "message": "", "data": [["q " + text, "a"]]}
+
+
+def test_dir_with_same_stem_files(tmp_path, monkeypatch):
+    # no LLM and no spacy model, the documents are the chunks
+    monkeypatch.setattr(batch, "create_qa_provider", lambda config: FakeQAProvider())
+    monkeypatch.setattr(
+        document2csv.Document2CSVTransform,
+        "_split_documents",
+        lambda self, documents: documents,
+    )
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    (input_dir / "report.txt").write_text("text report", encoding="utf-8")
+    (input_dir / "report.md").write_text("markdown report", encoding="utf-8")
+    output_dir = tmp_path / "output"
+
+    result = CliRunner().invoke(
+        convert_cli,
+        [
+            "dir",
+            str(input_dir),
+            json.dumps({"type": "openai"}),
+            "--output-dir",
+            str(output_dir),
+            "--num-workers",
+            "1",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    manifest = json.loads((output_dir / "manifest.json").read_text())
+    outputs = [item["output"] for item in manifest]
+    assert sorted(outputs) == [
+        str(output_dir / "report.md.csv"),
+        str(output_dir / "report.txt.csv"),
+    ]
+    for item in manifest:
+        assert item["status"] == 200
+        with open(item["output"], newline="") as file:
+            rows = list(csv.reader(file))
+        # the header and the QA row of the file itself
+        assert len(rows) == 2
+        assert rows[1][4] == open(item["file"], encoding="utf-8").read()
@@ -13,7 +13,7 @@
 # limitations under the License.
 
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterable, Iterator, List
 
 from langchain_core.documents import Document
 
@@ -24,3 +24,11 @@ class TextSplitter(ABC):
     @abstractmethod
     def split_documents(self, documents: List[Document]) -> List[Document]:
         """Split document."""
+
+    def lazy_split_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """
+        Split the documents one by one while they are consumed,
+        so a lazily loaded file is never fully in memory.
+        """
+        for document in documents:
+            yield from self.split_documents([document])
@@ -0,0 +1,166 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+from typing import Callable, List
+
+from kubeagi_core.document_chunks.base import TextSplitter
+from kubeagi_core.document_chunks.tokenizer import Tokenizer, token_length_function
+from langchain.text_splitter import TextSplitter as LangchainTextSplitter
+from langchain_core.documents import Document
+
+# The end of a sentence: CJK or Latin terminators, or an ellipsis, a Latin
+# period only if it is followed by a whitespace (not 3.14 or example.com).
+# The closing quotes and brackets after the terminators belong to the sentence.
+# A blank line always ends a sentence.
+_SENTENCE_END_PATTERN = re.compile(
+    "".join(
+        [
+            r"(?:[。！？!?；;]+|…+|\.{3,}|\.(?=\s|$))",
+            r"[”’\"'」』）)\]】》〉]*\s*",
+            r"|\n\s*\n\s*",
+        ]
+    )
+)
+
+# where a sentence longer than the chunk size is split again
+_CLAUSE_END_PATTERN = re.compile(r"[，,、：:]+\s*")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split the text into sentences by the CJK and Latin punctuation rules."""
+    return _split_by(_SENTENCE_END_PATTERN, text)
+
+
+def _split_by(pattern, text):
+    splits = []
+    start = 0
+    for match in pattern.finditer(text):
+        end = match.end()
+        split = text[start:end].strip()
+        if split:
+            splits.append(split)
+        start = end
+
+    split = text[start:].strip()
+    if split:
+        splits.append(split)
+    return splits
+
+
+class _RuleTextSplitter(LangchainTextSplitter):
+    """Split the text by sentences, then merge them up to the chunk size."""
+
+    def __init__(self, separator: str = "", **kwargs):
+        super().__init__(**kwargs)
+        self._separator = separator
+
+    def split_text(self, text: str) -> List[str]:
+        splits = []
+        for sentence in split_sentences(text):
+            if self._length_function(sentence) <= self._chunk_size:
+                splits.append(sentence)
+                continue
+
+            # a very long sentence, split it by clauses,
+            # and cut what is still too long
+            for clause in _split_by(_CLAUSE_END_PATTERN, sentence):
+                if self._length_function(clause) <= self._chunk_size:
+                    splits.append(clause)
+                else:
+                    splits.extend(self._cut(clause))
+
+        # the tokens of the merged text may be more than the sum of the
+        # tokens of its splits, cut the chunks which went over the size
+        chunks = []
+        for chunk in self._merge_splits(splits, self._separator):
+            if self._length_function(chunk) <= self._chunk_size:
+                chunks.append(chunk)
+            else:
+                chunks.extend(self._cut(chunk))
+        return chunks
+
+    def _cut(self, text: str) -> List[str]:
+        """
+        Cut the text into the longest pieces within the chunk size, as measured
+        by the length function, so the cuts follow the tokens if it counts them.
+        A single character longer than the chunk size is a piece on its own.
+
+        The prefixes measured are at most about twice the length of a piece,
+        not the whole text, so a long text is not tokenized again for every piece.
+        """
+        pieces = []
+        while text:
+            # double the window from chunk size characters until it goes over
+            low, high = 1, min(len(text), max(int(self._chunk_size), 1))
+            while (
+                high < len(text)
+                and self._length_function(text[:high]) <= self._chunk_size
+            ):
+                low = high
+                high = min(high * 2, len(text))
+            # binary search the longest prefix within the chunk size in the window
+            while low < high:
+                middle = (low + high + 1) // 2
+                if self._length_function(text[:middle]) <= self._chunk_size:
+                    low = middle
+                else:
+                    high = middle - 1
+            pieces.append(text[:low])
+            text = text[low:]
+        return pieces
+
+
+class CJKSentenceSplitter(TextSplitter):
+    """
+    Rule-based sentence splitter for Chinese, Japanese and Korean text,
+    Latin sentences are supported as well.
+
+    The sentences end at 。！？；… and their Latin counterparts, together with
+    the closing quotes and brackets after them. No model is loaded, so it is
+    much faster than `SpacySplitter` to chunk the text.
+
+    Args:
+        separator: the separator to join the sentences of a chunk.
+        chunk_size: the maximum length of a chunk.
+        chunk_overlap: the length of the overlap between the chunks.
+        length_function: the length of a text, the number of characters by default.
+        tokenizer: the tokenizer of the target model, if it is set,
+            `chunk_size` and `chunk_overlap` are numbers of tokens.
+    """
+
+    def __init__(
+        self,
+        separator: str = "",
+        chunk_size: int = 500,
+        chunk_overlap: int = 10,
+        length_function: Callable[[str], int] = len,
+        tokenizer: Tokenizer = None,
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size "
+                f"({chunk_size}), should be smaller."
+            )
+        if tokenizer is not None:
+            length_function = token_length_function(tokenizer)
+        self._text_splitter = _RuleTextSplitter(
+            separator=separator,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=length_function,
+        )
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        return self._text_splitter.split_documents(documents)
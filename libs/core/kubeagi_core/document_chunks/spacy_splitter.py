@@ -12,12 +12,104 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import List
+import copy
+import logging
+import threading
+from typing import Iterable, Iterator, List
 
 from kubeagi_core.document_chunks.base import TextSplitter
-from langchain.text_splitter import SpacyTextSplitter
+from kubeagi_core.document_chunks.tokenizer import Tokenizer, token_length_function
+from langchain.text_splitter import TextSplitter as LangchainTextSplitter
 from langchain_core.documents import Document
 
+logger = logging.getLogger(__name__)
+
+# the components which are never needed to find the sentence boundaries
+_EXCLUDED_COMPONENTS = ["ner", "tagger", "attribute_ruler", "lemmatizer"]
+
+# spacy pipelines by (pipeline, use_senter), loading a pipeline from disk
+# is expensive, so it is done only once per process.
+_spacy_pipelines = {}
+_spacy_pipelines_lock = threading.Lock()
+
+
+def load_spacy_pipeline(pipeline: str, use_senter: bool = False):
+    """
+    Load the spacy pipeline for sentence segmentation, it is cached per process.
+
+    Args:
+        pipeline: the name of the spacy pipeline, or `sentencizer` for
+            the rule-based sentencizer.
+        use_senter: find the sentence boundaries with the `senter` component
+            instead of the `parser`, if the pipeline has one. It is several
+            times faster, and a little less accurate, the chunk boundaries
+            differ from the ones of the `parser`.
+    """
+    key = (pipeline, use_senter)
+    nlp = _spacy_pipelines.get(key)
+    if nlp is not None:
+        return nlp
+
+    with _spacy_pipelines_lock:
+        nlp = _spacy_pipelines.get(key)
+        if nlp is not None:
+            return nlp
+
+        import spacy
+
+        logger.info(f"Load spacy pipeline {pipeline}")
+        if pipeline == "sentencizer":
+            nlp = spacy.blank("en")
+            nlp.add_pipe("sentencizer")
+        else:
+            nlp = spacy.load(pipeline, exclude=_EXCLUDED_COMPONENTS)
+            if (
+                use_senter
+                and "senter" in nlp.component_names
+                and "parser" in nlp.pipe_names
+            ):
+                nlp.enable_pipe("senter")
+                nlp.disable_pipe("parser")
+
+        _spacy_pipelines[key] = nlp
+
+    return nlp
+
+
+class _SpacyTextSplitter(LangchainTextSplitter):
+    """Split the text by the sentences of a loaded spacy pipeline."""
+
+    def __init__(self, nlp, separator: str = "\n\n", **kwargs):
+        super().__init__(**kwargs)
+        self._nlp = nlp
+        self._separator = separator
+
+    def split_text(self, text: str) -> List[str]:
+        return self._merge_sents(self._nlp(text))
+
+    def split_documents_in_batches(
+        self, documents: Iterable[Document], batch_size: int, n_process: int
+    ) -> Iterator[Document]:
+        """
+        Segment the sentences of the documents in batches with `nlp.pipe`,
+        then merge the sentences of each document into chunks.
+        """
+        docs = self._nlp.pipe(
+            ((document.page_content, document) for document in documents),
+            as_tuples=True,
+            batch_size=batch_size,
+            n_process=n_process,
+        )
+        for doc, document in docs:
+            for chunk in self._merge_sents(doc):
+                yield Document(
+                    page_content=chunk, metadata=copy.deepcopy(document.metadata)
+                )
+
+    def _merge_sents(self, doc) -> List[str]:
+        splits = (s.text for s in doc.sents)
+        return self._merge_splits(splits, self._separator)
+
 
 class SpacySplitter(TextSplitter):
     def __init__(
@@ -26,8 +118,22 @@ class SpacySplitter(TextSplitter):
         pipeline: str = "zh_core_web_sm",
         chunk_size: int = 500,
         chunk_overlap: int = 10,
+        use_senter: bool = False,
+        batch_size: int = 64,
+        n_process: int = 1,
+        tokenizer: Tokenizer = None,
     ):
-        """Initialize the spacy text splitter."""
+        """
+        Initialize the spacy text splitter.
+
+        The spacy pipeline is loaded when it is used for the first time,
+        and shared by all the splitters of the process, see `load_spacy_pipeline`.
+        The documents are segmented in batches of `batch_size` documents,
+        by `n_process` processes. The sentences are found by the `parser`,
+        set `use_senter` for the faster `senter`, see `load_spacy_pipeline`.
+        If the tokenizer of the target model is set, `chunk_size` and
+        `chunk_overlap` are numbers of tokens instead of characters.
+        """
         if chunk_overlap > chunk_size:
             raise ValueError(
                 f"Got a larger chunk overlap ({chunk_overlap}) than chunk size "
@@ -37,13 +143,27 @@ class SpacySplitter(TextSplitter):
         self._chunk_overlap = chunk_overlap
         self._separator = separator
         self._pipeline = pipeline
+        self._use_senter = use_senter
+        self._batch_size = batch_size
+        self._n_process = n_process
+        self._length_function = len
+        if tokenizer is not None:
+            self._length_function = token_length_function(tokenizer)
+
+        self._text_splitter = None
 
     def split_documents(self, documents: List[Document]) -> List[Document]:
-        text_splitter = SpacyTextSplitter(
-            separator=self._separator,
-            pipeline=self._pipeline,
-            chunk_size=self._chunk_size,
-            chunk_overlap=self._chunk_overlap,
+        return list(self.lazy_split_documents(documents))
+
+    def lazy_split_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
+        if self._text_splitter is None:
+            self._text_splitter = _SpacyTextSplitter(
+                nlp=load_spacy_pipeline(self._pipeline, self._use_senter),
+                separator=self._separator,
+                chunk_size=self._chunk_size,
+                chunk_overlap=self._chunk_overlap,
+                length_function=self._length_function,
+            )
+        return self._text_splitter.split_documents_in_batches(
+            documents, batch_size=self._batch_size, n_process=self._n_process
         )
-        documents = text_splitter.split_documents(documents)
-        return documents
@@ -0,0 +1,93 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import os
+from abc import ABC, abstractmethod
+from typing import Callable, List
+
+
+class Tokenizer(ABC):
+    """Interface for the tokenizer of the target model, to budget the chunks by tokens."""
+
+    @abstractmethod
+    def encode(self, text: str) -> List[int]:
+        """Encode the text to token ids."""
+
+
+class TiktokenTokenizer(Tokenizer):
+    """
+    Tokenizer of the OpenAI models.
+
+    Args:
+        encoding_name: the tiktoken encoding.
+        model_name: the model name, the encoding of the model is used if it is set.
+    """
+
+    def __init__(self, encoding_name: str = "cl100k_base", model_name: str = None):
+        try:
+            import tiktoken
+        except ImportError:
+            raise ImportError(
+                "Could not import tiktoken, please install it with `pip install tiktoken`."
+            )
+
+        if model_name is not None:
+            self._encoding = tiktoken.encoding_for_model(model_name)
+        else:
+            self._encoding = tiktoken.get_encoding(encoding_name)
+
+    def encode(self, text: str) -> List[int]:
+        return self._encoding.encode(text, disallowed_special=())
+
+
+class HuggingFaceTokenizer(Tokenizer):
+    """
+    Fast tokenizer of a Hugging Face model, loaded from a local path.
+
+    Args:
+        path: the `tokenizer.json` file, or the model directory which contains it.
+    """
+
+    def __init__(self, path: str):
+        try:
+            from tokenizers import Tokenizer as FastTokenizer
+        except ImportError:
+            raise ImportError(
+                "Could not import tokenizers, please install it with `pip install tokenizers`."
+            )
+
+        if os.path.isdir(path):
+            path = os.path.join(path, "tokenizer.json")
+        self._tokenizer = FastTokenizer.from_file(path)
+
+    def encode(self, text: str) -> List[int]:
+        return self._tokenizer.encode(text, add_special_tokens=False).ids
+
+
+def token_length_function(
+    tokenizer: Tokenizer, cache_size: int = 65536
+) -> Callable[[str], int]:
+    """
+    Get the length function which counts the tokens of a text.
+
+    The counts are cached, as the splitters measure the same sentences
+    several times while merging them into chunks.
+    """
+
+    @functools.lru_cache(maxsize=cache_size)
+    def token_length(text: str) -> int:
+        return len(tokenizer.encode(text))
+
+    return token_length
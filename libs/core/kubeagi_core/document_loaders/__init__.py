@@ -1,4 +1,40 @@
-from kubeagi_core.document_loaders.docx import DocxLoader
-from kubeagi_core.document_loaders.pdf import PDFLoader
+import importlib
 
-__all__ = ["DocxLoader", "PDFLoader"]
+from kubeagi_core.document_loaders.registry import (
+    get_loader,
+    get_loader_class,
+    is_supported_file,
+    register_loader,
+    supported_extensions,
+)
+
+# the loaders are imported when they are first used,
+# so the heavy libraries of the unused formats are never imported
+_LAZY_LOADERS = {
+    "DocxLoader": "kubeagi_core.document_loaders.docx",
+    "HTMLLoader": "kubeagi_core.document_loaders.html",
+    "MarkdownLoader": "kubeagi_core.document_loaders.text",
+    "PDFLoader": "kubeagi_core.document_loaders.pdf",
+    "TextLoader": "kubeagi_core.document_loaders.text",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_LOADERS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_name), name)
+
+
+__all__ = [
+    "DocxLoader",
+    "HTMLLoader",
+    "MarkdownLoader",
+    "PDFLoader",
+    "TextLoader",
+    "get_loader",
+    "get_loader_class",
+    "is_supported_file",
+    "register_loader",
+    "supported_extensions",
+]
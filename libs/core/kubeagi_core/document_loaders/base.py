@@ -13,7 +13,7 @@
 # limitations under the License.
 
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List
 
 
 class BaseLoader(ABC):
@@ -25,3 +25,12 @@ class BaseLoader(ABC):
     @abstractmethod
     def load(self) -> List:
         """Load data into Document objects."""
+
+    def lazy_load(self) -> Iterator:
+        """
+        A lazy loader for Document objects.
+
+        The default one loads all the Documents at once,
+        loaders which can stream their Documents should override it.
+        """
+        yield from self.load()
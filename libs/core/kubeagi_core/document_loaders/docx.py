@@ -14,13 +14,16 @@
 
 import logging
 from pathlib import Path
-from typing import List
+from typing import Iterator, List
 
 from kubeagi_core.document_loaders.base import BaseLoader
-from langchain_community.document_loaders import Docx2txtLoader
+from kubeagi_core.document_loaders.docx_reader import read_docx_blocks
+from langchain_core.documents import Document
 
 logger = logging.getLogger(__name__)
 
+DOCX_LOAD_MODES = ["single", "elements", "sections"]
+
 
 class DocxLoader(BaseLoader):
     """Load docx files."""
@@ -28,14 +31,27 @@ class DocxLoader(BaseLoader):
     def __init__(
         self,
         file_path: str,
+        mode: str = "single",
     ):
         """
         Initialize the loader with a list of URL paths.
 
         Args:
             file_path (str): File Path.
+            mode (str): how the docx file is split into Documents.
+                single: the whole file as one Document.
+                elements: one Document per heading, paragraph or table.
+                sections: one Document per section, from a heading to the next one,
+                    so that the chunks do not cross the section boundaries.
+                    The headings without any text under them join the next section.
         """
+        if mode not in DOCX_LOAD_MODES:
+            raise ValueError(
+                f"Load mode [{mode}] is not supported. "
+                f"Can only be one of {DOCX_LOAD_MODES}"
+            )
         self._file_path = file_path
+        self._mode = mode
 
     def load(self) -> List:
         """
@@ -44,6 +60,19 @@ class DocxLoader(BaseLoader):
         Returns:
             List: A list of Document objects.
 
+        """
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator:
+        """
+        Load the Documents from the docx file.
+
+        The paragraphs and the tables are read one by one from the file, see
+        `read_docx_blocks`, only a section is kept in memory in the sections mode.
+
+        Returns:
+            Iterator[Document]: the Documents of the mode.
+
         """
         logger.info("Start to load docx file")
 
@@ -51,9 +80,53 @@ class DocxLoader(BaseLoader):
         path = Path(self._file_path)
         file_name = path.name
 
-        docx_loader = Docx2txtLoader(self._file_path)
-        documents = docx_loader.load()
-        for document in documents:
-            document.metadata["source"] = file_name
+        blocks = read_docx_blocks(self._file_path)
+        if self._mode == "single":
+            text = "\n\n".join(block.text for block in blocks)
+            yield Document(page_content=text, metadata={"source": file_name})
+            return
+
+        # the headings above the current block, by level
+        headings = {}
+        section = []
+        # a section is only closed once it has more than its headings
+        section_has_body = False
+        for block in blocks:
+            if block.category == "Heading":
+                if self._mode == "sections" and section_has_body:
+                    yield self._section_document(file_name, headings, section)
+                    section = []
+                    section_has_body = False
+                headings = {
+                    level: heading
+                    for level, heading in headings.items()
+                    if level < block.heading_level
+                }
+                headings[block.heading_level] = block.text
+
+            if self._mode == "sections":
+                section.append(block.text)
+                section_has_body = section_has_body or block.category != "Heading"
+                continue
+
+            metadata = {
+                "source": file_name,
+                "category": block.category,
+                "headings": _heading_path(headings),
+            }
+            if block.heading_level is not None:
+                metadata["heading_level"] = block.heading_level
+            yield Document(page_content=block.text, metadata=metadata)
+
+        if section:
+            yield self._section_document(file_name, headings, section)
+
+    def _section_document(self, file_name, headings, section):
+        return Document(
+            page_content="\n\n".join(section),
+            metadata={"source": file_name, "headings": _heading_path(headings)},
+        )
+
 
-        return documents
+def _heading_path(headings):
+    return " > ".join(headings[level] for level in sorted(headings))
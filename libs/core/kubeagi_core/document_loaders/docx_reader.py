@@ -0,0 +1,189 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+import zipfile
+from typing import Dict, Iterator, Optional
+from xml.etree import ElementTree
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_PARAGRAPH = _W + "p"
+_TABLE = _W + "tbl"
+_ROW = _W + "tr"
+_CELL = _W + "tc"
+_TEXT = _W + "t"
+_TAB = _W + "tab"
+_BREAKS = (_W + "br", _W + "cr")
+_STYLE = _W + "style"
+_STYLE_ID = _W + "styleId"
+_VAL = _W + "val"
+
+# the built-in heading styles, "heading 1" to "heading 9" and "Title"
+_HEADING_STYLE_PATTERN = re.compile(r"^heading\s*(\d)$", re.IGNORECASE)
+
+
+class DocxBlock:
+    """
+    A paragraph or a table of a docx file.
+
+    Args:
+        category: "Heading", "Paragraph" or "Table".
+        text: the text, the cells of a table row are separated by tabs.
+        heading_level: the level of a heading, from 1, None for the others.
+    """
+
+    __slots__ = ("category", "text", "heading_level")
+
+    def __init__(self, category: str, text: str, heading_level: int = None):
+        self.category = category
+        self.text = text
+        self.heading_level = heading_level
+
+    def __repr__(self):
+        return f"DocxBlock({self.category}, {self.heading_level}, {self.text!r})"
+
+
+def read_docx_blocks(file_path: str) -> Iterator[DocxBlock]:
+    """
+    Read the paragraphs and the tables of a docx file in the document order.
+
+    `word/document.xml` is parsed incrementally, each block is dropped from
+    the tree once it is yielded, so the memory stays flat on huge files.
+    The empty paragraphs are skipped.
+    """
+    with zipfile.ZipFile(file_path) as docx:
+        heading_styles = _read_heading_styles(docx)
+
+        with docx.open("word/document.xml") as document:
+            stack = []
+            table_depth = 0
+            for event, element in ElementTree.iterparse(
+                document, events=("start", "end")
+            ):
+                if event == "start":
+                    stack.append(element)
+                    if element.tag == _TABLE:
+                        table_depth += 1
+                    continue
+
+                stack.pop()
+                if element.tag == _TABLE:
+                    table_depth -= 1
+                    if table_depth > 0:
+                        continue
+                    block = DocxBlock("Table", _table_text(element))
+                elif element.tag == _PARAGRAPH and table_depth == 0:
+                    block = _paragraph_block(element, heading_styles)
+                else:
+                    continue
+
+                # drop the block from the tree, it is not needed any more
+                if stack:
+                    stack[-1].remove(element)
+                if block.text:
+                    yield block
+
+
+def _read_heading_styles(docx: zipfile.ZipFile) -> Dict[str, int]:
+    """Map the ids of the heading styles to their levels."""
+    try:
+        styles = ElementTree.fromstring(docx.read("word/styles.xml"))
+    except KeyError:
+        return {}
+
+    levels = {}
+    based_on = {}
+    for style in styles.iter(_STYLE):
+        style_id = style.get(_STYLE_ID)
+        name = style.find(_W + "name")
+        name = name.get(_VAL, "") if name is not None else ""
+
+        level = _outline_level(style.find(_W + "pPr"))
+        match = _HEADING_STYLE_PATTERN.match(name)
+        if level is None and match:
+            level = int(match.group(1))
+        if level is None and name.lower() == "title":
+            level = 1
+        if level is not None:
+            levels[style_id] = level
+
+        parent = style.find(_W + "basedOn")
+        if parent is not None:
+            based_on[style_id] = parent.get(_VAL)
+
+    # the styles based on a heading style are headings as well
+    for style_id in based_on:
+        parent = based_on.get(style_id)
+        seen = {style_id}
+        while style_id not in levels and parent is not None and parent not in seen:
+            if parent in levels:
+                levels[style_id] = levels[parent]
+            seen.add(parent)
+            parent = based_on.get(parent)
+    return levels
+
+
+def _outline_level(properties) -> Optional[int]:
+    """The heading level of the outline level in the paragraph properties."""
+    if properties is None:
+        return None
+    outline = properties.find(_W + "outlineLvl")
+    if outline is None:
+        return None
+    # 0 to 8 are the heading levels, 9 is the body text
+    value = int(outline.get(_VAL, "9"))
+    return value + 1 if value < 9 else None
+
+
+def _paragraph_block(paragraph, heading_styles) -> DocxBlock:
+    properties = paragraph.find(_W + "pPr")
+    level = _outline_level(properties)
+    if level is None and properties is not None:
+        style = properties.find(_W + "pStyle")
+        if style is not None:
+            level = heading_styles.get(style.get(_VAL))
+
+    text = _text(paragraph).strip()
+    if level is not None:
+        return DocxBlock("Heading", text, level)
+    return DocxBlock("Paragraph", text)
+
+
+def _table_text(table) -> str:
+    rows = []
+    for row in table.findall(_ROW):
+        cells = [
+            " ".join(
+                _text(paragraph).strip() for paragraph in cell.iter(_PARAGRAPH)
+            ).strip()
+            for cell in row.findall(_CELL)
+        ]
+        if any(cells):
+            rows.append("\t".join(cells))
+    return "\n".join(rows)
+
+
+def _text(element) -> str:
+    # w:tab is also the tag of the tab stops in the paragraph properties
+    tab_stops = {id(tab) for tabs in element.iter(_W + "tabs") for tab in tabs}
+    texts = []
+    for child in element.iter():
+        if child.tag == _TEXT:
+            texts.append(child.text or "")
+        elif child.tag == _TAB and id(child) not in tab_stops:
+            texts.append("\t")
+        elif child.tag in _BREAKS:
+            texts.append("\n")
+    return "".join(texts)
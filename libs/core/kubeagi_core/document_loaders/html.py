@@ -0,0 +1,160 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import re
+from pathlib import Path
+from typing import Iterator, List
+
+from kubeagi_core.document_loaders.base import BaseLoader
+from langchain_core.documents import Document
+from selectolax.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+# the elements which hold no readable text
+_IGNORED_TAGS = ["script", "style", "noscript", "template", "svg"]
+
+# the elements whose text is a paragraph of its own
+_BLOCK_TAGS = {
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "body",
+    "caption",
+    "dd",
+    "div",
+    "dl",
+    "dt",
+    "figcaption",
+    "figure",
+    "footer",
+    "form",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "header",
+    "li",
+    "main",
+    "nav",
+    "ol",
+    "p",
+    "pre",
+    "section",
+    "table",
+    "td",
+    "th",
+    "tr",
+    "ul",
+}
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class HTMLLoader(BaseLoader):
+    """Load html files."""
+
+    def __init__(
+        self,
+        file_path: str,
+        encoding: str = "utf-8",
+    ):
+        """
+        Initialize the loader with a list of URL paths.
+
+        Args:
+            file_path (str): File Path.
+            encoding (str): the encoding of the file.
+        """
+        self._file_path = file_path
+        self._encoding = encoding
+
+    def load(self) -> List:
+        """
+        Load and return all Documents from the html file.
+
+        Returns:
+            List: A list of Document objects.
+
+        """
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator:
+        """
+        Load the text of the html file as one Document.
+
+        The text of each block element, like a paragraph, a heading or a list
+        item, is separated by a blank line, a br element is a line break,
+        the whitespaces are collapsed except in the pre elements.
+        The scripts and the styles are removed.
+
+        Returns:
+            Iterator[Document]: one Document.
+
+        """
+        logger.info("Start to load html file")
+
+        file_name = Path(self._file_path).name
+        with open(self._file_path, encoding=self._encoding, errors="replace") as file:
+            tree = HTMLParser(file.read())
+        tree.strip_tags(_IGNORED_TAGS)
+
+        metadata = {"source": file_name}
+        title = tree.css_first("title")
+        if title is not None and title.text(strip=True):
+            metadata["title"] = title.text(strip=True)
+
+        yield Document(page_content=_html_text(tree), metadata=metadata)
+
+
+def _html_text(tree) -> str:
+    """Join the text nodes by their block elements, in the document order."""
+    root = tree.body or tree.root
+    if root is None:
+        return ""
+
+    blocks = []
+    texts = []
+    current_block = None
+    for node in root.traverse(include_text=True):
+        if node.tag == "br":
+            # a line break within the block, without the spaces around it
+            if texts:
+                texts[-1] = texts[-1].rstrip(" ")
+            texts.append("\n")
+            continue
+        if node.tag != "-text":
+            continue
+        block = node.parent
+        while block is not None and block.tag not in _BLOCK_TAGS:
+            block = block.parent
+        block_id = block.mem_id if block is not None else None
+        if block_id != current_block:
+            blocks.append("".join(texts).strip())
+            texts = []
+            current_block = block_id
+
+        text = node.text_content or ""
+        if block is None or block.tag != "pre":
+            text = _WHITESPACE_PATTERN.sub(" ", text)
+            if texts and texts[-1] == "\n":
+                text = text.lstrip(" ")
+        texts.append(text)
+    blocks.append("".join(texts).strip())
+
+    return "\n\n".join(block for block in blocks if block)
@@ -13,17 +13,32 @@
 # limitations under the License.
 
 import logging
+import math
+import mmap
 import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Iterator, List
 
 from kubeagi_core.document_loaders.base import BaseLoader
+from kubeagi_core.document_loaders.pdf_images import (
+    ExtractImagesResult,
+    extract_images,
+)
 from langchain_community.document_loaders import PyPDFLoader
-from PIL import Image
-from unstructured.partition.pdf import partition_pdf
+from langchain_core.documents import Document
 
 logger = logging.getLogger(__name__)
 
+_DIGITS_PATTERN = re.compile(r"\d+")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+# the digits are ignored in the lines up to this length, like "Page 3 of 10"
+_PAGE_NUMBER_LINE_LENGTH = 20
+# the minimum number of pages a worker extracts at a time
+_MIN_PAGES_PER_SHARD = 8
+
 
 class PDFLoader(BaseLoader):
     """Load pdf file."""
@@ -31,22 +46,50 @@ class PDFLoader(BaseLoader):
     def __init__(
         self,
         file_path: str,
+        strip_headers_footers: bool = False,
+        header_footer_lines: int = 3,
+        header_footer_ratio: float = 0.5,
+        num_workers: int = 1,
     ):
         """
         Initialize the loader with a list of URL paths.
 
         Args:
             file_path (str): File Path.
+            strip_headers_footers (bool): remove the running headers, footers
+                and page numbers, all the pages are loaded before the first one
+                is returned then.
+            header_footer_lines (int): how many lines at the top and the bottom
+                of a page may be a header or a footer.
+            header_footer_ratio (float): a line is a header or a footer if it is
+                at the same position on at least this fraction of the pages.
+            num_workers (int): the number of worker processes to extract the text,
+                the pages are split into shards and extracted in parallel
+                if it is larger than 1, each worker opens the file by itself.
         """
         self._file_path = file_path
+        self._strip_headers_footers = strip_headers_footers
+        self._header_footer_lines = header_footer_lines
+        self._header_footer_ratio = header_footer_ratio
+        self._num_workers = num_workers
 
     def load(self) -> List:
         """
-        Load and return all Documents from the docx file.
+        Load and return all Documents from the pdf file.
 
         Returns:
             List[Document]: A list of Document objects.
 
+        """
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator:
+        """
+        Load the Documents from the pdf file page by page.
+
+        Returns:
+            Iterator[Document]: one Document per page.
+
         """
         logger.info("Start to load pdf file")
 
@@ -54,12 +97,45 @@ class PDFLoader(BaseLoader):
         path = Path(self._file_path)
         file_name = path.name
 
-        pdf_loader = PyPDFLoader(self._file_path)
-        documents = pdf_loader.load()
+        if self._num_workers is not None and self._num_workers > 1:
+            documents = self._parallel_load()
+        else:
+            pdf_loader = PyPDFLoader(self._file_path)
+            documents = pdf_loader.lazy_load()
+        if self._strip_headers_footers:
+            documents = strip_headers_footers(
+                list(documents),
+                max_lines=self._header_footer_lines,
+                min_ratio=self._header_footer_ratio,
+            )
         for document in documents:
             document.metadata["source"] = file_name
+            yield document
 
-        return documents
+    def _parallel_load(self) -> Iterator:
+        """Extract the pages in shards with a process pool, in the page order."""
+        from pypdf import PdfReader
+
+        with open(self._file_path, "rb") as file:
+            num_pages = len(PdfReader(file).pages)
+
+        shard_size = max(
+            math.ceil(num_pages / (self._num_workers * 4)), _MIN_PAGES_PER_SHARD
+        )
+        shards = [
+            (self._file_path, start, min(start + shard_size, num_pages))
+            for start in range(0, num_pages, shard_size)
+        ]
+        logger.info(f"extract {num_pages} pages in {len(shards)} shards")
+
+        num_workers = min(self._num_workers, len(shards)) or 1
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            for pages in executor.map(_extract_pages, shards):
+                for page_number, text in pages:
+                    yield Document(
+                        page_content=text,
+                        metadata={"source": self._file_path, "page": page_number},
+                    )
 
     def extract_images(
         self,
@@ -67,7 +143,10 @@ class PDFLoader(BaseLoader):
         remove_small_images: bool = False,
         min_width: int = 400,
         min_height: int = 100,
-    ):
+        num_workers: int = 1,
+        pages_per_shard: int = 10,
+        use_cache: bool = True,
+    ) -> ExtractImagesResult:
         """
         extract images.
 
@@ -83,24 +162,105 @@ class PDFLoader(BaseLoader):
             min_height
                 Only applicable if `remove_small_images=True`.
                 The minimum height of the image.
+            num_workers
+                The number of worker processes, the pdf is split into
+                shards of `pages_per_shard` pages if it is larger than 1.
+            pages_per_shard
+                Only applicable if `num_workers` is larger than 1.
+                The number of pages partitioned by a worker at a time.
+            use_cache
+                Skip the extraction if the images of the same pdf content
+                are already extracted to the output dir with the same options.
+
+        Returns:
+            ExtractImagesResult: the images, the counts, the timings and the errors.
         """
-        try:
-            partition_pdf(
-                filename=self._file_path,
-                strategy="hi_res",
-                extract_images_in_pdf=True,
-                extract_image_block_output_dir=output_dir,
+        return extract_images(
+            file_path=self._file_path,
+            output_dir=output_dir,
+            remove_small_images=remove_small_images,
+            min_width=min_width,
+            min_height=min_height,
+            num_workers=num_workers,
+            pages_per_shard=pages_per_shard,
+            use_cache=use_cache,
+        )
+
+
+def _extract_pages(shard):
+    """Extract the text of the pages [start, end) in a worker process."""
+    from pypdf import PdfReader
+
+    file_path, start, end = shard
+    with open(file_path, "rb") as file:
+        # map the file instead of reading it, the workers share the page cache
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as stream:
+            reader = PdfReader(stream)
+            return [
+                (page_number, reader.pages[page_number].extract_text())
+                for page_number in range(start, end)
+            ]
+
+
+def strip_headers_footers(
+    documents: List, max_lines: int = 3, min_ratio: float = 0.5, min_pages: int = 3
+) -> List:
+    """
+    Remove the lines repeated at the same position on many pages.
+
+    The first and the last `max_lines` lines of every page are counted by
+    their position and text. The digits of the short lines are ignored, so
+    that "Page 3 of 10" matches "Page 4 of 10". The lines found on at least
+    `min_ratio` of the pages are removed. Each line is counted and checked once.
+
+    Args:
+        documents: the pages, their `page_content` is modified in place.
+        max_lines: how many lines at the top and the bottom of a page to check.
+        min_ratio: the fraction of the pages a line must be found on.
+        min_pages: the pages are kept as they are if there are fewer of them.
+    """
+    if len(documents) < min_pages or max_lines <= 0:
+        return documents
+
+    pages = [document.page_content.splitlines() for document in documents]
+    counter = Counter()
+    for lines in pages:
+        counter.update({key for _, key in _edge_line_keys(lines, max_lines)})
+
+    min_count = max(min_ratio * len(documents), 2)
+    repeated = {key for key, count in counter.items() if count >= min_count}
+    if not repeated:
+        return documents
+
+    stripped = 0
+    for document, lines in zip(documents, pages):
+        removed = {
+            index for index, key in _edge_line_keys(lines, max_lines) if key in repeated
+        }
+        if removed:
+            stripped += len(removed)
+            document.page_content = "\n".join(
+                line for index, line in enumerate(lines) if index not in removed
             )
+    logger.info(f"stripped {stripped} header and footer lines")
+    return documents
+
 
-            if remove_small_images:
-                for filename in os.listdir(output_dir):
-                    if filename.lower().endswith(
-                        (".png", ".jpg", ".jpeg", ".gif", ".bmp")
-                    ):
-                        file_path = os.path.join(output_dir, filename)
-                        with Image.open(file_path) as img:
-                            width, height = img.size
-                            if width < min_width and height < min_height:
-                                os.remove(file_path)
-        except Exception as e:
-            logger.info(f"extract images fail: {e}")
+def _edge_line_keys(lines, max_lines):
+    """
+    Yield the (index, key) of the non-blank lines at the top and the bottom,
+    the key is the position from the top or the bottom and the normalized text.
+    On a short page, the top gets the first half of the lines and the bottom
+    the rest, so a line is never both a header and a footer.
+    """
+    indexes = [index for index, line in enumerate(lines) if line.strip()]
+    top_lines = min(max_lines, (len(indexes) + 1) // 2)
+    bottom_lines = min(max_lines, len(indexes) - top_lines)
+    edges = [(position, index) for position, index in enumerate(indexes[:top_lines])]
+    bottom = indexes[len(indexes) - bottom_lines :]
+    edges += [(position - len(bottom), index) for position, index in enumerate(bottom)]
+    for position, index in edges:
+        text = _WHITESPACE_PATTERN.sub("", lines[index])
+        if len(text) <= _PAGE_NUMBER_LINE_LENGTH:
+            text = _DIGITS_PATTERN.sub("#", text)
+        yield index, (position, text)
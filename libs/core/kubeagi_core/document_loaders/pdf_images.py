@@ -0,0 +1,282 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp")
+
+# the extraction of an unchanged pdf with the same options is skipped
+# if this file in the output dir records the same key
+CACHE_MARKER = ".extract_images.json"
+
+# the images written by unstructured, like figure-3-1.jpg for the first
+# figure of the page 3
+_IMAGE_NAME_PATTERN = re.compile(r"^(?P<kind>[a-z]+)-(?P<page>\d+)-(?P<index>\d+)$")
+
+
+class ExtractImagesResult:
+    """
+    The result of the image extraction of a pdf file.
+
+    Args:
+        images: the paths of the images kept in the output dir.
+        extracted: the number of the extracted images.
+        filtered: the number of the images removed as they are too small.
+        cached: the images of the previous extraction are reused.
+        partition_seconds: the time of the layout detection and extraction.
+        filter_seconds: the time of the size filtering.
+        errors: the error messages, one per failed shard.
+    """
+
+    def __init__(
+        self,
+        images: List[str] = None,
+        extracted: int = 0,
+        filtered: int = 0,
+        cached: bool = False,
+        partition_seconds: float = 0.0,
+        filter_seconds: float = 0.0,
+        errors: List[str] = None,
+    ):
+        self.images = images or []
+        self.extracted = extracted
+        self.filtered = filtered
+        self.cached = cached
+        self.partition_seconds = partition_seconds
+        self.filter_seconds = filter_seconds
+        self.errors = errors or []
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def to_dict(self):
+        return {
+            "images": self.images,
+            "extracted": self.extracted,
+            "filtered": self.filtered,
+            "cached": self.cached,
+            "partition_seconds": round(self.partition_seconds, 3),
+            "filter_seconds": round(self.filter_seconds, 3),
+            "errors": self.errors,
+        }
+
+    def __repr__(self):
+        return f"ExtractImagesResult({self.to_dict()})"
+
+
+def extract_images(
+    file_path: str,
+    output_dir: str,
+    remove_small_images: bool = False,
+    min_width: int = 400,
+    min_height: int = 100,
+    num_workers: int = 1,
+    pages_per_shard: int = 10,
+    use_cache: bool = True,
+) -> ExtractImagesResult:
+    """
+    Extract the images of a pdf file with the `hi_res` partition of unstructured.
+
+    Args:
+        file_path: the pdf file.
+        output_dir: where the images are written.
+        remove_small_images: remove the images smaller than
+            `min_width` x `min_height`.
+        min_width: the minimum width of the image.
+        min_height: the minimum height of the image.
+        num_workers: the number of worker processes, the pdf is split into
+            shards of `pages_per_shard` pages if it is larger than 1.
+        pages_per_shard: the number of pages partitioned by a worker at a time.
+        use_cache: skip the extraction if the output dir already holds the
+            images of the same pdf content extracted with the same options.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cache_key = _cache_key(file_path, remove_small_images, min_width, min_height)
+    if use_cache:
+        result = _load_cache(output_dir, cache_key)
+        if result is not None:
+            logger.info(f"images of {file_path} are cached in {output_dir}")
+            return result
+
+    result = ExtractImagesResult()
+    start = time.time()
+    with tempfile.TemporaryDirectory(dir=output_dir) as work_dir:
+        shards = _split_pdf(file_path, work_dir, num_workers, pages_per_shard)
+        if num_workers > 1 and len(shards) > 1:
+            with ProcessPoolExecutor(max_workers=min(num_workers, len(shards))) as pool:
+                shard_results = list(pool.map(_partition_shard, shards))
+        else:
+            shard_results = [_partition_shard(shard) for shard in shards]
+
+        for (_, _, first_page), (images, error) in zip(shards, shard_results):
+            if error:
+                result.errors.append(error)
+            result.images.extend(
+                _move_image(image, output_dir, first_page) for image in images
+            )
+    result.extracted = len(result.images)
+    result.partition_seconds = time.time() - start
+
+    if remove_small_images:
+        start = time.time()
+        kept = []
+        for image in result.images:
+            if _is_small_image(image, min_width, min_height):
+                os.remove(image)
+            else:
+                kept.append(image)
+        result.filtered = len(result.images) - len(kept)
+        result.images = kept
+        result.filter_seconds = time.time() - start
+
+    if result.ok:
+        _save_cache(output_dir, cache_key, result)
+    logger.info(f"extract images of {file_path}: {result}")
+    return result
+
+
+def _split_pdf(file_path, work_dir, num_workers, pages_per_shard):
+    """
+    Split the pdf into (pdf path, images dir, first page) shards.
+
+    The page numbers of a shard start from `first page` + 1, as unstructured
+    numbers the pages from 1.
+    """
+    if num_workers <= 1:
+        return [(file_path, os.path.join(work_dir, "0"), 0)]
+
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(file_path)
+    num_pages = len(reader.pages)
+    shards = []
+    for first_page in range(0, num_pages, pages_per_shard):
+        writer = PdfWriter()
+        for page in reader.pages[first_page : first_page + pages_per_shard]:
+            writer.add_page(page)
+        shard_path = os.path.join(work_dir, f"{first_page}.pdf")
+        with open(shard_path, "wb") as file:
+            writer.write(file)
+        shards.append((shard_path, os.path.join(work_dir, str(first_page)), first_page))
+    return shards
+
+
+def _partition_shard(shard):
+    """Extract the images of a shard, returns the image paths and the error."""
+    # unstructured is heavy to import, only import it when it is used
+    from unstructured.partition.pdf import partition_pdf
+
+    file_path, images_dir, _ = shard
+    try:
+        partition_pdf(
+            filename=file_path,
+            strategy="hi_res",
+            extract_images_in_pdf=True,
+            extract_image_block_output_dir=images_dir,
+        )
+        error = ""
+    except Exception:
+        error = f"extract images of {file_path} fail: {traceback.format_exc()}"
+        logger.error(error)
+
+    if not os.path.isdir(images_dir):
+        return [], error
+    images = [
+        os.path.join(images_dir, filename)
+        for filename in sorted(os.listdir(images_dir))
+        if filename.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+    return images, error
+
+
+def _move_image(image, output_dir, first_page):
+    """Move the image of a shard to the output dir, with the page number of the pdf."""
+    name, extension = os.path.splitext(os.path.basename(image))
+    match = _IMAGE_NAME_PATTERN.match(name)
+    if match:
+        page = int(match.group("page")) + first_page
+        name = f"{match.group('kind')}-{page}-{match.group('index')}"
+    elif first_page:
+        name = f"{first_page}-{name}"
+
+    target = os.path.join(output_dir, name + extension)
+    shutil.move(image, target)
+    return target
+
+
+def _is_small_image(image, min_width, min_height):
+    from PIL import Image
+
+    # the size is read from the image header, the pixels are not decoded
+    with Image.open(image) as img:
+        width, height = img.size
+    return width < min_width and height < min_height
+
+
+def _cache_key(file_path, *options):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(json.dumps(options).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _load_cache(output_dir, cache_key):
+    marker = os.path.join(output_dir, CACHE_MARKER)
+    if not os.path.exists(marker):
+        return None
+    try:
+        with open(marker) as file:
+            cache = json.load(file)
+    except ValueError:
+        return None
+
+    images = cache.get("images") or []
+    if cache.get("key") != cache_key or not all(map(os.path.exists, images)):
+        return None
+    return ExtractImagesResult(
+        images=images,
+        extracted=cache.get("extracted", len(images)),
+        filtered=cache.get("filtered", 0),
+        cached=True,
+    )
+
+
+def _save_cache(output_dir, cache_key, result):
+    with open(os.path.join(output_dir, CACHE_MARKER), "w") as file:
+        json.dump(
+            {
+                "key": cache_key,
+                "images": result.images,
+                "extracted": result.extracted,
+                "filtered": result.filtered,
+            },
+            file,
+            ensure_ascii=False,
+            indent=2,
+        )
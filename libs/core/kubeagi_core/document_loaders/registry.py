@@ -0,0 +1,122 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib
+import mimetypes
+from pathlib import Path
+from typing import Dict, List, Type, Union
+
+from kubeagi_core.document_loaders.base import BaseLoader
+
+# The loaders by the file extension, as "module:class" so that the module,
+# and the heavy libraries it imports, is only imported when it is used.
+_LOADERS: Dict[str, Union[str, Type[BaseLoader]]] = {
+    ".pdf": "kubeagi_core.document_loaders.pdf:PDFLoader",
+    ".docx": "kubeagi_core.document_loaders.docx:DocxLoader",
+    ".txt": "kubeagi_core.document_loaders.text:TextLoader",
+    ".md": "kubeagi_core.document_loaders.text:MarkdownLoader",
+    ".markdown": "kubeagi_core.document_loaders.text:MarkdownLoader",
+    ".html": "kubeagi_core.document_loaders.html:HTMLLoader",
+    ".htm": "kubeagi_core.document_loaders.html:HTMLLoader",
+}
+
+# the file extensions by the MIME type
+_MIME_TYPES: Dict[str, str] = {
+    "application/pdf": ".pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "text/plain": ".txt",
+    "text/markdown": ".md",
+    "text/x-markdown": ".md",
+    "text/html": ".html",
+}
+
+
+def register_loader(
+    extension: str,
+    loader: Union[str, Type[BaseLoader]],
+    mime_types: List[str] = None,
+):
+    """
+    Register a loader for the file extension.
+
+    Args:
+        extension: the file extension, like ".pdf".
+        loader: the loader class, or its "module:class" path to import it lazily,
+            it is created with the file path as `file_path`.
+        mime_types: the MIME types of the files the loader is used for.
+    """
+    extension = _normalize_extension(extension)
+    _LOADERS[extension] = loader
+    for mime_type in mime_types or []:
+        _MIME_TYPES[mime_type] = extension
+
+
+def supported_extensions() -> List[str]:
+    """The file extensions which have a loader."""
+    return list(_LOADERS)
+
+
+def is_supported_file(file_path: str, mime_type: str = None) -> bool:
+    """Whether a loader is registered for the file."""
+    return _extension(file_path, mime_type) in _LOADERS
+
+
+def get_loader_class(file_path: str, mime_type: str = None) -> Type[BaseLoader]:
+    """
+    Get the loader class of the file, by the MIME type if it is given,
+    otherwise by the file extension.
+    """
+    extension = _extension(file_path, mime_type)
+    loader = _LOADERS.get(extension)
+    if loader is None:
+        raise ValueError(
+            f"File type of [{file_path}] is not supported. "
+            f"Can only be one of {supported_extensions()}"
+        )
+
+    if isinstance(loader, str):
+        module_name, class_name = loader.split(":")
+        loader = getattr(importlib.import_module(module_name), class_name)
+        _LOADERS[extension] = loader
+    return loader
+
+
+def get_loader(file_path: str, mime_type: str = None, **kwargs) -> BaseLoader:
+    """
+    Create the loader of the file.
+
+    Args:
+        file_path: the file to load.
+        mime_type: the MIME type of the file, the file extension is used if not set.
+        kwargs: the other arguments of the loader.
+    """
+    return get_loader_class(file_path, mime_type)(file_path=file_path, **kwargs)
+
+
+def _extension(file_path, mime_type=None):
+    if mime_type is None:
+        extension = _normalize_extension(Path(file_path).suffix)
+        if extension in _LOADERS:
+            return extension
+        mime_type, _ = mimetypes.guess_type(file_path)
+    if mime_type is None:
+        return ""
+    return _MIME_TYPES.get(mime_type.split(";")[0].strip().lower(), "")
+
+
+def _normalize_extension(extension):
+    extension = extension.lower()
+    if extension and not extension.startswith("."):
+        extension = "." + extension
+    return extension
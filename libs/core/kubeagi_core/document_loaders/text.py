@@ -0,0 +1,158 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import re
+from pathlib import Path
+from typing import Iterator, List
+
+from kubeagi_core.document_loaders.base import BaseLoader
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+MARKDOWN_LOAD_MODES = ["single", "sections"]
+
+# an ATX heading, like "## Title"
+_HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+
+
+class TextLoader(BaseLoader):
+    """Load plain text files."""
+
+    def __init__(
+        self,
+        file_path: str,
+        encoding: str = "utf-8",
+    ):
+        """
+        Initialize the loader with a list of URL paths.
+
+        Args:
+            file_path (str): File Path.
+            encoding (str): the encoding of the file.
+        """
+        self._file_path = file_path
+        self._encoding = encoding
+
+    def load(self) -> List:
+        """
+        Load and return all Documents from the text file.
+
+        Returns:
+            List: A list of Document objects.
+
+        """
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator:
+        """
+        Load the text file as one Document.
+
+        Returns:
+            Iterator[Document]: one Document.
+
+        """
+        logger.info("Start to load text file")
+
+        file_name = Path(self._file_path).name
+        with open(self._file_path, encoding=self._encoding) as file:
+            text = file.read()
+        yield Document(page_content=text, metadata={"source": file_name})
+
+
+class MarkdownLoader(TextLoader):
+    """Load markdown files."""
+
+    def __init__(
+        self,
+        file_path: str,
+        encoding: str = "utf-8",
+        mode: str = "single",
+    ):
+        """
+        Initialize the loader with a list of URL paths.
+
+        Args:
+            file_path (str): File Path.
+            encoding (str): the encoding of the file.
+            mode (str): how the markdown file is split into Documents.
+                single: the whole file as one Document.
+                sections: one Document per section, from a heading to the next one,
+                    the headings without any text under them join the next section,
+                    the headings in the code blocks are ignored.
+        """
+        if mode not in MARKDOWN_LOAD_MODES:
+            raise ValueError(
+                f"Load mode [{mode}] is not supported. "
+                f"Can only be one of {MARKDOWN_LOAD_MODES}"
+            )
+        super().__init__(file_path=file_path, encoding=encoding)
+        self._mode = mode
+
+    def lazy_load(self) -> Iterator:
+        """
+        Load the Documents from the markdown file, the file is read line by line.
+
+        Returns:
+            Iterator[Document]: the Documents of the mode.
+
+        """
+        if self._mode == "single":
+            yield from super().lazy_load()
+            return
+
+        logger.info("Start to load markdown file")
+        file_name = Path(self._file_path).name
+
+        # the headings above the current line, by level
+        headings = {}
+        section = []
+        # a section is only closed once it has more than its headings
+        section_has_body = False
+        in_code_block = False
+        with open(self._file_path, encoding=self._encoding) as file:
+            for line in file:
+                if _FENCE_PATTERN.match(line):
+                    in_code_block = not in_code_block
+                match = None if in_code_block else _HEADING_PATTERN.match(line)
+                if match is None:
+                    section.append(line)
+                    section_has_body = section_has_body or bool(line.strip())
+                    continue
+
+                if section_has_body:
+                    yield _section_document(file_name, headings, section)
+                    section = []
+                    section_has_body = False
+                level = len(match.group(1))
+                headings = {
+                    key: heading for key, heading in headings.items() if key < level
+                }
+                headings[level] = match.group(2)
+                section.append(line)
+
+        if "".join(section).strip():
+            yield _section_document(file_name, headings, section)
+
+
+def _section_document(file_name, headings, section):
+    return Document(
+        page_content="".join(section).strip(),
+        metadata={
+            "source": file_name,
+            "headings": " > ".join(headings[level] for level in sorted(headings)),
+        },
+    )
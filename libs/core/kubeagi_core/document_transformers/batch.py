@@ -0,0 +1,277 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from pathlib import Path
+from typing import Any, Dict, List
+
+from kubeagi_core.document_loaders import is_supported_file, supported_extensions
+from kubeagi_core.qa_provider.cache import CachedQAProvider
+from kubeagi_core.qa_provider.factory import create_qa_provider, is_supported_llm_type
+from .document2csv import Document2CSVTransform, _ordered_map
+
+logger = logging.getLogger(__name__)
+
+
+class Batch2CSVTransform:
+    """
+    Transform many files to csv files, one csv file per input file.
+
+    Loading, splitting and cleaning are CPU-bound, they run in a process pool
+    with one file per worker. The QA generation of all the files shares one
+    QA provider in the main process, the prepared files are generated
+    concurrently, and at most `max_concurrency` of the llm config chunks of
+    all of them are sent to the LLM at the same time, so many small files
+    keep the LLM as busy as one large file.
+    The csv file and the `manifest.json` entry of a file are written as soon
+    as the file is done, the manifest in the output dir records the result
+    of every file in the order of the file paths.
+
+    Args:
+        file_paths: the files to transform, see
+            `kubeagi_core.document_loaders.supported_extensions` for the supported types.
+        llm_config: llm config for generate qa, see `Document2CSVTransform`.
+        data_cleaning_config: data processing clean config, see `Document2CSVTransform`.
+        output_dir: file output path, the csv file of `input_dir/a/b.pdf`
+            is written to `output_dir/a/b.pdf.csv`, the file extension is kept,
+            so `b.pdf` and `b.docx` do not write to the same csv file.
+        input_dir: the directory the file paths are relative to.
+        chunk_size: chunk size.
+        chunk_overlap: chunk overlap.
+        num_workers: the number of worker processes to load the files,
+            the default value is the number of CPUs.
+        dedup_config: drop the duplicate chunks of each file, see `Document2CSVTransform`.
+        loader_configs: the other arguments of the loaders by file extension,
+            like `{".pdf": {"strip_headers_footers": True}}`.
+    """
+
+    def __init__(
+        self,
+        file_paths: List[str],
+        llm_config: Dict[str, Any],
+        data_cleaning_config: List[Dict[str, Any]] = None,
+        output_dir: str = None,
+        input_dir: str = None,
+        chunk_size: int = None,
+        chunk_overlap: int = None,
+        num_workers: int = None,
+        dedup_config: Dict[str, Any] = None,
+        loader_configs: Dict[str, Dict[str, Any]] = None,
+    ):
+        if input_dir is None:
+            input_dir = os.path.commonpath(
+                [os.path.dirname(os.path.abspath(path)) for path in file_paths]
+            )
+        if output_dir is None:
+            output_dir = input_dir
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+
+        for file_path in file_paths:
+            if not is_supported_file(file_path):
+                raise ValueError(
+                    f"File type of [{file_path}] is not supported. "
+                    f"Can only be one of {supported_extensions()}"
+                )
+
+        self._file_paths = file_paths
+        self._llm_config = llm_config
+        self._data_cleaning_config = data_cleaning_config
+        self._output_dir = output_dir
+        self._input_dir = input_dir
+        self._chunk_size = chunk_size
+        self._chunk_overlap = chunk_overlap
+        self._num_workers = int(num_workers)
+        self._dedup_config = dedup_config
+        self._loader_configs = {
+            extension.lower(): config
+            for extension, config in (loader_configs or {}).items()
+        }
+
+    def transform(self):
+        logger.info(f"start batch transform {len(self._file_paths)} files to csv")
+        if not is_supported_llm_type(self._llm_config.get("type")):
+            return {"status": 1000, "message": "暂时不支持该类型的模型", "data": ""}
+
+        os.makedirs(self._output_dir, exist_ok=True)
+        qa_provider = create_qa_provider(self._llm_config)
+        max_concurrency = int(self._llm_config.get("max_concurrency") or 1)
+        limited_provider = _ConcurrencyLimitedQAProvider(qa_provider, max_concurrency)
+
+        # the files are prepared ahead in the worker processes,
+        # while the threads generate the QA of the prepared ones.
+        transforms = [self._file_transform(path) for path in self._file_paths]
+        prepared = _ordered_map(
+            _prepare_chunks,
+            transforms,
+            self._num_workers,
+            executor_class=ProcessPoolExecutor,
+        )
+
+        # the manifest items by the index of their files
+        manifest = {}
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            running = set()
+            for index, (transform, prepared_file) in enumerate(
+                zip(transforms, prepared)
+            ):
+                running.add(
+                    executor.submit(
+                        _transform_file,
+                        index,
+                        transform,
+                        prepared_file,
+                        limited_provider,
+                    )
+                )
+                # the prepared files wait here, instead of in memory
+                if len(running) >= max_concurrency:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._write_manifest(manifest, *future.result())
+            for future in as_completed(running):
+                self._write_manifest(manifest, *future.result())
+
+        if isinstance(qa_provider, CachedQAProvider):
+            logger.info(f"qa cache stats {qa_provider.cache.stats()}")
+
+        manifest = [manifest[index] for index in sorted(manifest)]
+        failed = [item for item in manifest if item["status"] != 200]
+        if failed:
+            return {
+                "status": 1000,
+                "message": f"{len(failed)} of {len(manifest)} files failed",
+                "data": manifest,
+            }
+        return {"status": 200, "message": "", "data": manifest}
+
+    def _write_manifest(self, manifest, index, item):
+        """Add the item of a done file, and write the manifest, so it is
+        useful even if the batch is interrupted."""
+        logger.info(f"file transformed {item}")
+        manifest[index] = item
+        with open(os.path.join(self._output_dir, "manifest.json"), "w") as file:
+            json.dump(
+                [manifest[index] for index in sorted(manifest)],
+                file,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+    def _file_transform(self, file_path):
+        relative_dir = os.path.relpath(
+            os.path.dirname(os.path.abspath(file_path)), self._input_dir
+        )
+        output_dir = os.path.normpath(os.path.join(self._output_dir, relative_dir))
+        os.makedirs(output_dir, exist_ok=True)
+
+        return Document2CSVTransform(
+            file_path=file_path,
+            llm_config=self._llm_config,
+            data_cleaning_config=self._data_cleaning_config,
+            output_dir=output_dir,
+            chunk_size=self._chunk_size,
+            chunk_overlap=self._chunk_overlap,
+            dedup_config=self._dedup_config,
+            loader_config=self._loader_configs.get(Path(file_path).suffix.lower()),
+            output_file_name=Path(file_path).name + ".csv",
+        )
+
+
+class _ConcurrencyLimitedQAProvider:
+    """
+    Limit the QA generations in flight of all the files sharing the QA provider.
+
+    Args:
+        qa_provider: the shared QA provider.
+        max_concurrency: the maximum number of generations at the same time.
+    """
+
+    def __init__(self, qa_provider, max_concurrency: int):
+        self._qa_provider = qa_provider
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+    def generate_qa_list(self, *args, **kwargs):
+        with self._semaphore:
+            return self._qa_provider.generate_qa_list(*args, **kwargs)
+
+    def generate_packed_qa_lists(self, *args, **kwargs):
+        with self._semaphore:
+            return self._qa_provider.generate_packed_qa_lists(*args, **kwargs)
+
+
+def _transform_file(index, transform: Document2CSVTransform, prepared, qa_provider):
+    """
+    Generate the QA list of a prepared file and write its csv file.
+
+    Returns:
+        the index of the file and its manifest item.
+    """
+    chunks, error, prepare_seconds = prepared
+    start = time.time()
+    if error:
+        res = {"status": 1000, "message": error, "data": ""}
+    else:
+        res = transform._transform_chunks(chunks, qa_provider=qa_provider)
+
+    item = {
+        "file": transform._file_path,
+        "output": transform.output_file_path(),
+        "status": res.get("status"),
+        "message": res.get("message"),
+        "chunks": len(chunks),
+        "qa_count": max(len(res.get("data") or []) - 1, 0),
+        "prepare_seconds": round(prepare_seconds, 3),
+        "qa_seconds": round(time.time() - start, 3),
+    }
+    return index, item
+
+
+def _prepare_chunks(transform: Document2CSVTransform):
+    """
+    Load, split and clean a file in a worker process.
+
+    Returns:
+        (document, cleaned content) pairs, the error message and the elapsed seconds.
+    """
+    start = time.time()
+    try:
+        loader = transform._create_loader()
+        documents = transform._split_documents(loader.lazy_load())
+        chunks = list(transform._clean_chunks(documents))
+        return chunks, "", time.time() - start
+    except Exception:
+        logger.error(
+            "".join(
+                [
+                    f"Failed to load the file {transform._file_path}.\n",
+                    f"The tracing error is: \n{traceback.format_exc()}\n",
+                ]
+            )
+        )
+        return [], "文件加载失败", time.time() - start
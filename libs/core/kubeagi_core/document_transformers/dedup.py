@@ -0,0 +1,155 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import hashlib
+import re
+import zlib
+from collections import defaultdict
+from typing import Iterable, Iterator, List
+
+import numpy as np
+from langchain_core.documents import Document
+
+# the largest prime below 2^32 for the MinHash permutations (a * h + b) % p,
+# with a, b and the 32 bits shingle hashes below it, a * h + b fits in uint64
+_PRIME = np.uint64((1 << 32) - 5)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class ChunkDeduplicator:
+    """
+    Drop the duplicate and near-duplicate chunks.
+
+    Exact duplicates are found by the hash of the text, with the whitespaces
+    removed. Near duplicates are found by MinHash signatures of the character
+    shingles, indexed by LSH, so each chunk is only compared with the few
+    chunks sharing one of its LSH buckets. The first chunk of a group of
+    duplicates is kept.
+
+    Args:
+        threshold: the estimated Jaccard similarity from which two chunks
+            are near duplicates.
+        num_perm: the number of MinHash permutations.
+        shingle_size: the number of characters of a shingle.
+        seed: the seed of the MinHash permutations.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold [{threshold}] should be in (0, 1].")
+
+        self._threshold = threshold
+        self._num_perm = num_perm
+        self._shingle_size = shingle_size
+        self._bands, self._rows = _lsh_params(threshold, num_perm)
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+        self._exact_hashes = set()
+        self._buckets = [defaultdict(list) for _ in range(self._bands)]
+        self._signatures = []
+
+        self._total = 0
+        self._exact_duplicates = 0
+        self._near_duplicates = 0
+
+    def is_duplicate(self, text: str) -> bool:
+        """Check the text against the texts seen before, then remember it if it is new."""
+        self._total += 1
+        normalized = _WHITESPACE_PATTERN.sub("", text)
+
+        exact_hash = hashlib.sha1(normalized.encode("utf-8")).digest()
+        if exact_hash in self._exact_hashes:
+            self._exact_duplicates += 1
+            return True
+        self._exact_hashes.add(exact_hash)
+
+        signature = self._minhash(normalized)
+        band_keys = [
+            signature[band * self._rows : (band + 1) * self._rows].tobytes()
+            for band in range(self._bands)
+        ]
+
+        candidates = set()
+        for buckets, key in zip(self._buckets, band_keys):
+            candidates.update(buckets.get(key, ()))
+        for candidate in candidates:
+            similarity = np.mean(self._signatures[candidate] == signature)
+            if similarity >= self._threshold:
+                self._near_duplicates += 1
+                return True
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for buckets, key in zip(self._buckets, band_keys):
+            buckets[key].append(index)
+        return False
+
+    def lazy_deduplicate(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Yield the documents which are not duplicates of the ones before."""
+        for document in documents:
+            if not self.is_duplicate(document.page_content):
+                yield document
+
+    def deduplicate(self, documents: Iterable[Document]) -> List[Document]:
+        """Return the documents which are not duplicates of the ones before."""
+        return list(self.lazy_deduplicate(documents))
+
+    def stats(self):
+        """How many chunks were checked and dropped."""
+        dropped = self._exact_duplicates + self._near_duplicates
+        return {
+            "total": self._total,
+            "kept": self._total - dropped,
+            "dropped": dropped,
+            "exact_duplicates": self._exact_duplicates,
+            "near_duplicates": self._near_duplicates,
+        }
+
+    def _minhash(self, text: str):
+        size = self._shingle_size
+        shingles = {text[i : i + size] for i in range(max(len(text) - size + 1, 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) % _PRIME for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+
+def _lsh_params(threshold: float, num_perm: int):
+    """
+    Choose the number of bands and rows per band, so that the chunks with the
+    threshold similarity become LSH candidates with a probability of 50%.
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows != 0:
+            continue
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
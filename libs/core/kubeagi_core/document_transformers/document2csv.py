@@ -0,0 +1,515 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import collections
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+from pathlib import Path
+
+from kubeagi_core.document_chunks.spacy_splitter import SpacySplitter
+from kubeagi_core.document_loaders import get_loader
+from .dedup import ChunkDeduplicator
+from .pipeline import CleaningPipeline
+from kubeagi_core.qa_provider.cache import CachedQAProvider
+from kubeagi_core.qa_provider.factory import create_qa_provider, is_supported_llm_type
+
+logger = logging.getLogger(__name__)
+
+# the llm config which changes the generated QA lists, a checkpoint
+# written with other values of them is not resumed
+_QA_CONFIG_KEYS = [
+    "type",
+    "model",
+    "base_url",
+    "temperature",
+    "top_p",
+    "max_tokens",
+    "prompt_template",
+    "packed_prompt_template",
+    "pack_max_chunks",
+    "pack_max_chars",
+    "stream_max_pairs",
+]
+
+
+class Document2CSVTransform:
+    """
+    document to csv transform, the loader is chosen by the file type.
+
+    Args:
+        file_path: file path, see `kubeagi_core.document_loaders.supported_extensions`
+            for the supported file types.
+        llm_config: llm config for generate qa.
+            model: model name to use.
+            base_url: base URL path for API requests.
+            api_key: llm api key.
+            type: llm type.
+            temperature
+            top_p
+            max_tokens
+            prompt_template
+            retry_count: the maximum number of invocations of a chunk.
+            retry_wait_seconds: the waiting time of the first retry, it doubles
+                after each retry, a malformed answer is retried at once.
+            retry_max_wait_seconds: the maximum waiting time of a retry.
+            retry_max_elapsed_seconds: give up a chunk after retrying this long.
+            rate_limit_rpm: the maximum number of LLM requests per minute.
+            rate_limit_tpm: the maximum number of LLM tokens per minute, the
+                tokens are estimated from the prompt length and max_tokens.
+            rate_limit_path: share the rate limits through this SQLite file,
+                between all the processes using it.
+            cache_path: cache the generated QA lists in this file, so an unchanged
+                chunk is not sent to the LLM again.
+            cache_max_entries: the maximum number of cached QA lists.
+            max_concurrency: the maximum number of chunks sent to the LLM at the same time,
+                the default value is 1 which generates QA one chunk at a time.
+            pack_max_chunks: pack up to this number of consecutive short chunks
+                into one LLM request, the QA pairs are given back to their chunks
+                by the markers of the packed prompt, the default value is 1
+                which sends every chunk alone. Raise max_tokens along with it,
+                the answer holds the QA pairs of all the packed chunks.
+            pack_max_chars: the maximum characters of the chunks of a pack,
+                the default value is 2000.
+            packed_prompt_template: the prompt template of the packed requests,
+                see `kubeagi_core.qa_provider.prompt.PACKED_PROMPT_TEMPLATE`.
+            streaming: stream the answers of the openai type and parse the QA
+                pairs while they arrive, an answer off the format is stopped early.
+            stream_max_pairs: stop a streamed answer once it has this number of
+                QA pairs, no limit if it is not set.
+        data_cleaning_config: data processing clean config.
+            type: what type of data processing.
+                NOTE: including the following types
+                    remove_invisible_characters
+                    space_standardization
+                    fix_unicode
+                    chinese_convert
+                    remove_html_tag
+                    remove_emojis
+                    remove_email
+                    remove_ip_address
+                    remove_phone
+                    remove_id_card
+                    remove_weixin
+                    remove_bank_card
+            repl: the replacement values for the data to be processed.
+        output_dir: file output path.
+            The rows are appended to the csv file as soon as a chunk is done,
+            and the finished chunks are recorded in a `.checkpoint` file next to it,
+            so a failed run can be rerun without generating them again.
+            The checkpoint is dropped if the llm, cleaning, chunk, dedup or
+            loader config which decides the rows has changed since.
+        chunk_size: chunk size.
+        chunk_overlap: chunk overlap.
+        dedup_config: drop the duplicate and near-duplicate chunks before
+            generating QA, it is disabled if not set.
+            threshold: the similarity from which two chunks are near duplicates,
+                the default value is 0.9.
+            num_perm: the number of MinHash permutations.
+            shingle_size: the number of characters of a shingle.
+        loader_config: the other arguments of the loader of the file type,
+            like `mode` of `DocxLoader`.
+        output_file_name: the name of the csv file in the output dir,
+            the default value is the file name with a `.csv` extension
+            instead of its own, like `a.csv` for `a.pdf`.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        llm_config: Dict[str, Any],
+        data_cleaning_config: List[Dict[str, Any]] = None,
+        output_dir: str = None,
+        chunk_size: int = None,
+        chunk_overlap: int = None,
+        dedup_config: Dict[str, Any] = None,
+        loader_config: Dict[str, Any] = None,
+        output_file_name: str = None,
+    ):
+        if chunk_size is None:
+            chunk_size = 500
+        if chunk_overlap is None:
+            chunk_overlap = 50
+        if output_dir is None:
+            output_dir = os.path.dirname(file_path)
+
+        self._file_path = file_path
+        self._llm_config = llm_config
+        self._data_cleaning_config = data_cleaning_config
+        self._cleaning_pipeline = CleaningPipeline(data_cleaning_config)
+        self._output_dir = output_dir
+        self._chunk_size = chunk_size
+        self._chunk_overlap = chunk_overlap
+        self._dedup_config = dedup_config
+        self._loader_config = loader_config or {}
+        self._output_file_name = output_file_name
+
+    def transform(self):
+        logger.info(f"start transform {self._file_path} to csv")
+        loader = self._create_loader()
+
+        # load -> split -> clean -> QA are chained lazily,
+        # so only the pages being processed are kept in memory.
+        documents = self._split_documents(loader.lazy_load())
+        return self._transform_chunks(self._clean_chunks(documents))
+
+    def output_file_path(self) -> str:
+        """The csv file the QA list is written to."""
+        file_name = self._output_file_name
+        if file_name is None:
+            file_name = Path(self._file_path).stem + ".csv"
+        return self._output_dir + "/" + file_name
+
+    def _config_hash(self) -> str:
+        """The hash of the config which decides the chunks and their QA lists."""
+        llm_config = {
+            key: value
+            for key, value in self._llm_config.items()
+            if key in _QA_CONFIG_KEYS
+        }
+        config = [
+            llm_config,
+            self._data_cleaning_config,
+            self._chunk_size,
+            self._chunk_overlap,
+            self._dedup_config,
+            self._loader_config,
+        ]
+        data = json.dumps(config, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _create_loader(self):
+        return get_loader(self._file_path, **self._loader_config)
+
+    def _split_documents(self, documents):
+        # Text splitter
+        text_splitter = SpacySplitter(
+            separator="\n\n",
+            pipeline="zh_core_web_sm",
+            chunk_size=self._chunk_size,
+            chunk_overlap=self._chunk_overlap,
+        )
+        return text_splitter.lazy_split_documents(documents)
+
+    def _clean_chunks(self, documents):
+        """Yield (document, cleaned content) pairs, without the duplicate chunks."""
+        deduplicator = None
+        if self._dedup_config is not None:
+            deduplicator = ChunkDeduplicator(**self._dedup_config)
+
+        for document in documents:
+            content = document.page_content.replace("\n", "")
+            content = self._cleaning_pipeline.apply(content)
+            if deduplicator is not None and deduplicator.is_duplicate(content):
+                continue
+            yield document, content
+
+        if deduplicator is not None:
+            logger.info(f"chunk dedup stats {deduplicator.stats()}")
+
+    def _transform_chunks(self, chunks, qa_provider=None):
+        """
+        Generate the QA list of the cleaned chunks and save it to the csv file.
+
+        Args:
+            chunks: (document, cleaned content) pairs.
+            qa_provider: the QA provider to use, one is created from
+                the llm config if it is not given.
+        """
+        output_file_path = self.output_file_path()
+        logger.info(f"file output path {output_file_path}")
+
+        if not is_supported_llm_type(self._llm_config.get("type")):
+            return {"status": 1000, "message": "暂时不支持该类型的模型", "data": ""}
+
+        if qa_provider is None:
+            # one provider for the whole run, so that the HTTP connections
+            # and the prompt chain are reused by every chunk
+            qa_provider = create_qa_provider(self._llm_config)
+
+        # save qa list for csv
+        header = ["q", "a", "file_name", "page_number", "chunk_content"]
+        writer = _CheckpointCSVWriter(output_file_path, header, self._config_hash())
+        try:
+            res = self._data_transform(chunks, qa_provider, writer)
+        finally:
+            writer.close()
+
+        if res.get("status") != 200:
+            return res
+
+        writer.remove_checkpoint()
+        qa_data_dict = [header]
+        qa_data_dict.extend(res.get("data"))
+
+        return {"status": 200, "message": "", "data": qa_data_dict}
+
+    def _data_transform(self, chunks, qa_provider, writer=None):
+        """
+        Generate the QA list of the chunks.
+
+        Args:
+            chunks: (document, cleaned content) pairs.
+            qa_provider: the QA provider.
+            writer: the rows of each chunk are written to it once the chunk is done,
+                and the chunks it has already done are skipped.
+        """
+        # the rows of the chunks done before a resume are in the result too
+        qa_list = list(writer.resumed_rows) if writer is not None else []
+        done_chunk_ids = writer.done_chunk_ids if writer is not None else set()
+
+        def skip_done_chunks():
+            for index, (document, content) in enumerate(chunks):
+                chunk_id = _chunk_id(index, document)
+                if chunk_id not in done_chunk_ids:
+                    yield chunk_id, document, content
+
+        def generate_qa(chunk):
+            chunk_id, document, content = chunk
+            data = qa_provider.generate_qa_list(
+                text=content,
+                prompt_template=self._llm_config.get("prompt_template"),
+                retry_count=self._llm_config.get("retry_count"),
+                retry_wait_seconds=self._llm_config.get("retry_wait_seconds"),
+            )
+            return chunk_id, document, data
+
+        def generate_packed_qa(pack):
+            if len(pack) == 1:
+                return [generate_qa(pack[0])]
+
+            data = qa_provider.generate_packed_qa_lists(
+                texts=[content for _, _, content in pack],
+                prompt_template=self._llm_config.get("packed_prompt_template"),
+                retry_count=self._llm_config.get("retry_count"),
+                retry_wait_seconds=self._llm_config.get("retry_wait_seconds"),
+            )
+            if data.get("status") != 200:
+                chunk_id, document, _ = pack[0]
+                return [(chunk_id, document, data)]
+
+            results = []
+            for chunk, qa_list in zip(pack, data.get("data")):
+                if len(qa_list) == 0:
+                    # the model skipped the chunk, ask for it alone
+                    results.append(generate_qa(chunk))
+                    continue
+                chunk_id, document, _ = chunk
+                results.append(
+                    (
+                        chunk_id,
+                        document,
+                        {"status": 200, "message": "", "data": qa_list},
+                    )
+                )
+            return results
+
+        logger.info("start generate qa")
+        max_concurrency = int(self._llm_config.get("max_concurrency") or 1)
+        packs = _pack_chunks(
+            skip_done_chunks(),
+            max_chunks=int(self._llm_config.get("pack_max_chunks") or 1),
+            max_chars=int(self._llm_config.get("pack_max_chars") or 2000),
+        )
+        results = _ordered_map(generate_packed_qa, packs, max_concurrency)
+        for chunk_id, document, data in itertools.chain.from_iterable(results):
+            if data.get("status") != 200:
+                results.close()
+                return data
+
+            rows = [
+                [
+                    qa[0],
+                    qa[1],
+                    document.metadata.get("source"),
+                    document.metadata.get("page"),
+                    document.page_content.replace("\n", ""),
+                ]
+                for qa in data.get("data")
+            ]
+            if writer is not None:
+                writer.write(chunk_id, rows)
+            qa_list.extend(rows)
+        logger.info("generate qa finished")
+        if isinstance(qa_provider, CachedQAProvider):
+            logger.info(f"qa cache stats {qa_provider.cache.stats()}")
+
+        return {"status": 200, "message": "", "data": qa_list}
+
+
+class _CheckpointCSVWriter:
+    """
+    Append the QA rows to the csv file chunk by chunk.
+
+    The ids of the finished chunks are recorded in a checkpoint file next to
+    the csv file, each with the size of the csv file once its rows are written.
+    If both exist when the writer is created, and the checkpoint was written
+    with the same config, the run resumes: the csv file is truncated to the
+    last recorded size, which drops the rows of a chunk that was not marked
+    as done, the rows are appended, `done_chunk_ids` holds the chunks to skip
+    and `resumed_rows` the rows already in the csv file. Otherwise the csv file is written from the start.
+
+    Args:
+        output_file_path: the csv file.
+        header: the header row of the csv file.
+        config_hash: the hash of the config which decides the rows.
+    """
+
+    def __init__(self, output_file_path: str, header: List[str], config_hash: str):
+        self._checkpoint_path = output_file_path + ".checkpoint"
+
+        self.done_chunk_ids = set()
+        self.resumed_rows = []
+        size = None
+        if os.path.exists(output_file_path) and os.path.exists(self._checkpoint_path):
+            size = self._read_checkpoint(config_hash)
+
+        if size is not None:
+            logger.info(
+                f"resume from checkpoint, skip {len(self.done_chunk_ids)} chunks"
+            )
+            with open(output_file_path, "r+b") as file:
+                file.truncate(size)
+            with open(output_file_path, newline="") as file:
+                # skip the header
+                self.resumed_rows = list(csv.reader(file))[1:]
+            self._file = open(output_file_path, "a", newline="")
+            self._checkpoint = open(self._checkpoint_path, "a")
+            self._writer = csv.writer(self._file)
+            return
+
+        self._file = open(output_file_path, "w", newline="")
+        self._checkpoint = open(self._checkpoint_path, "w")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(header)
+        self._file.flush()
+        self._checkpoint.write(f"#config\t{config_hash}\t{self._size()}\n")
+        self._checkpoint.flush()
+
+    def _read_checkpoint(self, config_hash):
+        """
+        Read the done chunks of the checkpoint.
+
+        Returns:
+            the size of the csv file after the last done chunk,
+            None if the checkpoint is of another config.
+        """
+        with open(self._checkpoint_path) as checkpoint:
+            lines = checkpoint.read().split("\n")
+        # the last line is empty, or a line cut by a crash
+        lines = [line.split("\t") for line in lines[:-1]]
+        if not lines or lines[0][:2] != ["#config", config_hash]:
+            logger.warning("the checkpoint is of another config, start over")
+            return None
+
+        size = int(lines[0][2])
+        for chunk_id, chunk_size in lines[1:]:
+            self.done_chunk_ids.add(chunk_id)
+            size = int(chunk_size)
+        return size
+
+    def write(self, chunk_id: str, rows: List[List[Any]]):
+        """Write the rows of a chunk, then mark the chunk as done."""
+        self._writer.writerows(rows)
+        self._file.flush()
+        self._checkpoint.write(f"{chunk_id}\t{self._size()}\n")
+        self._checkpoint.flush()
+
+    def _size(self):
+        return os.fstat(self._file.fileno()).st_size
+
+    def close(self):
+        self._file.close()
+        self._checkpoint.close()
+
+    def remove_checkpoint(self):
+        """Remove the checkpoint once the whole file is done."""
+        if os.path.exists(self._checkpoint_path):
+            os.remove(self._checkpoint_path)
+
+
+def _chunk_id(index: int, document) -> str:
+    """The id of a chunk, it is stable between the runs on the same file."""
+    key = "\n".join(
+        [
+            str(index),
+            str(document.metadata.get("page")),
+            document.page_content,
+        ]
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _pack_chunks(chunks, max_chunks: int, max_chars: int) -> Iterator[List[Any]]:
+    """
+    Group the consecutive chunks into packs to send in one LLM request,
+    a pack has at most `max_chunks` chunks and `max_chars` characters of
+    content, unless a single chunk is longer.
+
+    Args:
+        chunks: (chunk id, document, cleaned content) tuples.
+    """
+    pack = []
+    size = 0
+    for chunk in chunks:
+        length = len(chunk[2])
+        if pack and (len(pack) >= max_chunks or size + length > max_chars):
+            yield pack
+            pack = []
+            size = 0
+        pack.append(chunk)
+        size += length
+    if pack:
+        yield pack
+
+
+def _ordered_map(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_concurrency: int,
+    executor_class=ThreadPoolExecutor,
+) -> Iterator[Any]:
+    """
+    Apply `fn` to every item with at most `max_concurrency` calls in flight.
+
+    The results are yielded in the same order as `items`, no matter in which
+    order the calls complete. Use a ProcessPoolExecutor as `executor_class`
+    for CPU-bound calls, `fn` and the items must be picklable then.
+    """
+    if max_concurrency <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    with executor_class(max_workers=max_concurrency) as executor:
+        pending = collections.deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(fn, item))
+                if len(pending) >= max_concurrency:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # stop the calls which have not been started yet,
+            # e.g. when the caller gives up after a failed chunk.
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,107 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List
+
+from .transform import Clean, DataConvert, FixUnicode
+
+# The cleaning types in the order they are applied to the text,
+# each one with the default value of `repl`.
+CLEANING_TYPES = [
+    ("remove_invisible_characters", ""),
+    ("space_standardization", " "),
+    ("fix_unicode", None),
+    ("chinese_convert", None),
+    ("remove_html_tag", None),
+    ("remove_emojis", ""),
+    ("remove_email", "xxxx"),
+    ("remove_ip_address", "xxxx"),
+    ("remove_phone", "xxxx"),
+    ("remove_id_card", "xxxx"),
+    ("remove_weixin", "xxxx"),
+    ("remove_bank_card", "xxxx"),
+]
+
+
+class CleaningPipeline:
+    """
+    Data cleaning pipeline built once from the data cleaning config.
+
+    The config is validated and turned into an ordered list of operators with
+    their `repl` values bound, so cleaning a text is a single pass over the
+    operators instead of a scan of the config.
+
+    Args:
+        data_cleaning_config: data processing clean config.
+            type: what type of data processing, one of `CLEANING_TYPES`.
+            repl: the replacement values for the data to be processed.
+    """
+
+    def __init__(self, data_cleaning_config: List[Dict[str, Any]] = None):
+        if data_cleaning_config is None:
+            data_cleaning_config = []
+
+        supported_types = [cleaning_type for cleaning_type, _ in CLEANING_TYPES]
+        items = {}
+        for item in data_cleaning_config:
+            cleaning_type = item.get("type")
+            if cleaning_type not in supported_types:
+                raise ValueError(
+                    f"Data cleaning type [{cleaning_type}] is not supported. "
+                    f"Can only be one of {supported_types}"
+                )
+            # the first item of a type wins
+            items.setdefault(cleaning_type, item)
+
+        data_convert = DataConvert()
+        operators = {
+            "remove_invisible_characters": data_convert.invisible_characters_convert,
+            "space_standardization": data_convert.space_convert,
+            "fix_unicode": FixUnicode().process,
+            "chinese_convert": data_convert.chinese_convert,
+            "remove_html_tag": Clean().clean_html,
+            "remove_emojis": data_convert.emojis_convert,
+            "remove_email": data_convert.email_convert,
+            "remove_ip_address": data_convert.ip_convert,
+            "remove_phone": data_convert.phone_convert,
+            "remove_id_card": data_convert.id_card_convert,
+            "remove_weixin": data_convert.weixin_convert,
+            "remove_bank_card": data_convert.bank_card_convert,
+        }
+
+        self._operators: List[Callable[[str], str]] = []
+        for cleaning_type, default_repl in CLEANING_TYPES:
+            item = items.get(cleaning_type)
+            if item is None:
+                continue
+
+            operator = operators[cleaning_type]
+            if default_repl is not None:
+                operator = partial(operator, repl=item.get("repl", default_repl))
+            self._operators.append(operator)
+
+    def __len__(self):
+        return len(self._operators)
+
+    def apply(self, text: str) -> str:
+        """Clean one text."""
+        for operator in self._operators:
+            text = operator(text)
+        return text
+
+    def apply_many(self, texts: Iterable[str]) -> List[str]:
+        """Clean a batch of texts."""
+        return [self.apply(text) for text in texts]
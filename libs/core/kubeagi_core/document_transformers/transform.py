@@ -14,13 +14,101 @@
 
 
 import emoji
+import functools
 import opencc
 import re
+import threading
 import ftfy
 
 from selectolax.parser import HTMLParser
 from . import special_characters
 
+# The default patterns are compiled once when the module is imported,
+# instead of relying on the small cache of the re module.
+_BANK_CARD_PATTERN = re.compile(
+    r"\b([1-9]{1})(\d{15}|\d{18})(?![0-9])", flags=re.DOTALL
+)
+
+_EMAIL_PATTERN = re.compile(
+    r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", flags=re.DOTALL
+)
+
+# 18 digits id card | 15 digits id card
+_ID_CARD_PATTERN = re.compile(
+    "|".join(
+        [
+            r"\b([1-9]\d{5}[1-9]\d{3})((0\d)|(1[0-2]))(([0|1|2]\d)|(3[0-1]))(\d{3}[0-9Xx])(?![0-9])",
+            r"\b([1-9]\d{7})((0\d)|(1[0-2]))(([0-2][1-9])|(3[0-1]))(\d{2}[0-9Xx])(?![0-9])",
+        ]
+    ),
+    flags=re.DOTALL,
+)
+
+_IP_PATTERN = re.compile(
+    "".join(
+        [
+            r"((?:(?:1[0-9][0-9]\.)|(?:2[0-4][0-9]\.)|",
+            r"(?:25[0-5]\.)|(?:[1-9][0-9]\.)|(?:[0-9]\.))",
+            r"{3}(?:(?:1[0-9][0-9])|(?:2[0-4][0-9])|",
+            r"(?:25[0-5])|(?:[1-9][0-9])|(?:[0-9]))|",
+            r"([\da-fA-F]{1,4}:){7}[\da-fA-F]{1,4})",
+        ]
+    ),
+    flags=re.DOTALL,
+)
+
+_PHONE_PATTERN = re.compile(
+    r"((\+|00)86)?(1)((3[\d])|(4[5,6,7,9])|(5[0-3,5-9])|(6[5-7])|(7[0-8])|(8[\d])|(9[1,8,9]))(\d{8})(?![0-9])",
+    flags=re.DOTALL,
+)
+
+_WEIXIN_PATTERN = re.compile(
+    "".join(
+        [
+            r"(?:vxin|vx|VX|Vxin|wx|WX|wei xin|weixin|",
+            r"微信|微信号|薇信|薇信号|v信|V信)",
+            r"[：|:][a-zA-Z0-9{3,20}]+",
+        ]
+    ),
+    flags=re.DOTALL,
+)
+
+_INVISIBLE_CHARACTERS_PATTERN = re.compile(
+    r"[\x00-\x1F\x7F-\x9F\xAD\r\t\b\x0B\x1C\x1D\x1E]", flags=re.DOTALL
+)
+
+# all the whitespaces are single characters, match them with a character set
+_SPACE_PATTERN = re.compile(
+    "[{}]".format(
+        "".join(
+            re.escape(value) for value in sorted(special_characters.VARIOUS_WHITESPACES)
+        )
+    ),
+    flags=re.DOTALL,
+)
+
+OPENCC_MODES = [
+    "s2t",
+    "t2s",
+    "s2tw",
+    "tw2s",
+    "s2hk",
+    "hk2s",
+    "s2twp",
+    "tw2sp",
+    "t2tw",
+    "tw2t",
+    "hk2t",
+    "t2hk",
+    "t2jp",
+    "jp2t",
+]
+
+# OpenCC converters by mode, loading the dictionaries of a mode is expensive,
+# so it is done only once per process.
+_opencc_converters = {}
+_opencc_converters_lock = threading.Lock()
+
 
 class DataConvert:
     def chinese_convert(self, text, mode: str = "t2s"):
@@ -43,121 +131,45 @@ class DataConvert:
         t2jp: Traditional Chinese Characters (Kyūjitai) to New Japanese Kanji,
         jp2t: New Japanese Kanji (Shinjitai) to Traditional Chinese Characters,
         """
-        mode_list = [
-            "s2t",
-            "t2s",
-            "s2tw",
-            "tw2s",
-            "s2hk",
-            "hk2s",
-            "s2twp",
-            "tw2sp",
-            "t2tw",
-            "tw2t",
-            "hk2t",
-            "t2hk",
-            "t2jp",
-            "jp2t",
-        ]
-        assert mode in mode_list, "Please make sure mode is one of {}".format(mode_list)
-
-        clean_text = opencc.OpenCC(mode).convert(text)
+        clean_text = _get_opencc_converter(mode).convert(text)
         return clean_text
 
+    def chinese_convert_many(self, texts, mode: str = "t2s"):
+        """
+        Convert a batch of texts with the same converter,
+        see `chinese_convert` for the modes.
+        """
+        converter = _get_opencc_converter(mode)
+        return [converter.convert(text) for text in texts]
+
     def bank_card_convert(self, text, pattern: str = None, repl: str = ""):
         """convert bank card in text."""
-        if pattern is None:
-            pattern = r"\b([1-9]{1})(\d{15}|\d{18})(?![0-9])"
-
-        if not re.search(pattern, text, flags=re.DOTALL):
-            return text
-
-        clean_text = re.sub(pattern=pattern, repl=repl, string=text, flags=re.DOTALL)
-        return clean_text
+        return _sub(_BANK_CARD_PATTERN, text, pattern, repl)
 
     def email_convert(self, text, pattern: str = None, repl: str = ""):
         """convert email in text."""
-        if pattern is None:
-            pattern = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-
-        if not re.search(pattern, text, flags=re.DOTALL):
-            return text
-
-        clean_text = re.sub(pattern=pattern, repl=repl, string=text, flags=re.DOTALL)
-        return clean_text
+        return _sub(_EMAIL_PATTERN, text, pattern, repl)
 
     def emojis_convert(self, text, pattern: str = None, repl: str = ""):
         """convert emojis in text."""
-        if pattern is None:
-            emojis = list(emoji.EMOJI_DATA.keys())
-            pattern = "|".join(re.escape(value) for value in emojis)
-
-        if not re.search(pattern, text, flags=re.DOTALL):
-            return text
-
-        clean_text = re.sub(pattern=pattern, repl=repl, string=text, flags=re.DOTALL)
-        return clean_text
+        return _sub(_emoji_pattern(), text, pattern, repl)
 
     def id_card_convert(self, text, repl: str = ""):
         """convert id card in text."""
-        pattern = [
-            r"\b([1-9]\d{5}[1-9]\d{3})((0\d)|(1[0-2]))(([0|1|2]\d)|(3[0-1]))(\d{3}[0-9Xx])(?![0-9])",
-            r"\b([1-9]\d{7})((0\d)|(1[0-2]))(([0-2][1-9])|(3[0-1]))(\d{2}[0-9Xx])(?![0-9])",
-        ]
-
-        for regex_exp in pattern:
-            text = re.sub(pattern=regex_exp, repl=repl, string=text, flags=re.DOTALL)
-        return text
+        return _ID_CARD_PATTERN.sub(repl, text)
 
     def ip_convert(self, text, pattern: str = None, repl: str = ""):
         """convert ip in text."""
-        if pattern is None:
-            pattern = "".join(
-                [
-                    r"((?:(?:1[0-9][0-9]\.)|(?:2[0-4][0-9]\.)|",
-                    r"(?:25[0-5]\.)|(?:[1-9][0-9]\.)|(?:[0-9]\.))",
-                    r"{3}(?:(?:1[0-9][0-9])|(?:2[0-4][0-9])|",
-                    r"(?:25[0-5])|(?:[1-9][0-9])|(?:[0-9]))|",
-                    r"([\da-fA-F]{1,4}:){7}[\da-fA-F]{1,4})",
-                ]
-            )
-
-        if not re.search(pattern, text, flags=re.DOTALL):
-            return text
-
-        clean_text = re.sub(pattern=pattern, repl=repl, string=text, flags=re.DOTALL)
-        return clean_text
+        return _sub(_IP_PATTERN, text, pattern, repl)
 
     def phone_convert(self, text, pattern: str = None, repl: str = ""):
-        """convert ip in text."""
-        if pattern is None:
-            pattern = r"((\+|00)86)?(1)((3[\d])|(4[5,6,7,9])|(5[0-3,5-9])|(6[5-7])|(7[0-8])|(8[\d])|(9[1,8,9]))(\d{8})(?![0-9])"
-
-        if not re.search(pattern, text, flags=re.DOTALL):
-            return text
-
-        clean_text = re.sub(pattern=pattern, repl=repl, string=text, flags=re.DOTALL)
-        return clean_text
+        """convert phone in text."""
+        return _sub(_PHONE_PATTERN, text, pattern, repl)
 
     def weixin_convert(self, text, pattern: str = None, repl: str = ""):
         """convert weixin in text."""
         if pattern is None:
-            pattern = [
-                r"vxin[：|:][a-zA-Z0-9{3,20}]+",
-                r"vx[：|:][a-zA-Z0-9{3,20}]+",
-                r"VX[：|:][a-zA-Z0-9{3,20}]+",
-                r"Vxin[：|:][a-zA-Z0-9{3,20}]+",
-                r"wx[：|:][a-zA-Z0-9{3,20}]+",
-                r"WX[：|:][a-zA-Z0-9{3,20}]+",
-                r"wei xin[：|:][a-zA-Z0-9{3,20}]+",
-                r"weixin[：|:][a-zA-Z0-9{3,20}]+",
-                r"微信[：|:][a-zA-Z0-9{3,20}]+",
-                r"微信号[：|:][a-zA-Z0-9{3,20}]+",
-                r"薇信[：|:][a-zA-Z0-9{3,20}]+",
-                r"薇信号[：|:][a-zA-Z0-9{3,20}]+",
-                r"v信[：|:][a-zA-Z0-9{3,20}]+",
-                r"V信[：|:][a-zA-Z0-9{3,20}]+",
-            ]
+            return _WEIXIN_PATTERN.sub(repl, text)
 
         for regex_exp in pattern:
             text = re.sub(pattern=regex_exp, repl=repl, string=text, flags=re.DOTALL)
@@ -165,26 +177,86 @@ class DataConvert:
 
     def invisible_characters_convert(self, text, pattern: str = None, repl: str = ""):
         """convert invisible characters in text."""
-        if pattern is None:
-            pattern = r"[\x00-\x1F\x7F-\x9F\xAD\r\t\b\x0B\x1C\x1D\x1E]"
-
-        if not re.search(pattern, text, flags=re.DOTALL):
-            return text
-
-        clean_text = re.sub(pattern=pattern, repl=repl, string=text, flags=re.DOTALL)
-        return clean_text
+        return _sub(_INVISIBLE_CHARACTERS_PATTERN, text, pattern, repl)
 
     def space_convert(self, text, pattern: str = None, repl: str = " "):
         """convert space in text."""
-        if pattern is None:
-            various_whitespaces = special_characters.VARIOUS_WHITESPACES
-            pattern = "|".join(re.escape(value) for value in various_whitespaces)
+        return _sub(_SPACE_PATTERN, text, pattern, repl)
+
+
+def _get_opencc_converter(mode):
+    """Get the cached OpenCC converter of the mode, it is created on first use."""
+    assert mode in OPENCC_MODES, "Please make sure mode is one of {}".format(
+        OPENCC_MODES
+    )
+
+    converter = _opencc_converters.get(mode)
+    if converter is None:
+        with _opencc_converters_lock:
+            converter = _opencc_converters.get(mode)
+            if converter is None:
+                converter = opencc.OpenCC(mode)
+                _opencc_converters[mode] = converter
+
+    return converter
+
+
+@functools.lru_cache(maxsize=None)
+def _emoji_pattern():
+    """
+    Build the emoji pattern once, when it is used for the first time.
+
+    The emojis are compiled as a trie, so matching one position only follows
+    the branch of its first character, and the longest emoji sequence
+    (e.g. with skin tone or ZWJ) wins over its prefix.
+    """
+    trie = {}
+    for value in emoji.EMOJI_DATA.keys():
+        node = trie
+        for char in value:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    return re.compile(_trie_to_regex(trie), flags=re.DOTALL)
+
+
+def _trie_to_regex(node):
+    """Convert a trie node to a regex, the end of a word is marked by an empty key."""
+    leaves = []
+    branches = []
+    for char, child in node.items():
+        if char == "":
+            continue
+        if list(child) == [""]:
+            leaves.append(re.escape(char))
+        else:
+            branches.append(re.escape(char) + _trie_to_regex(child))
 
-        if not re.search(pattern, text, flags=re.DOTALL):
-            return text
+    if leaves:
+        branches.append(leaves[0] if len(leaves) == 1 else "[" + "".join(leaves) + "]")
 
-        clean_text = re.sub(pattern=pattern, repl=repl, string=text, flags=re.DOTALL)
-        return clean_text
+    if not branches:
+        return ""
+
+    if len(branches) == 1 and "" not in node:
+        return branches[0]
+
+    regex = "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        regex += "?"
+    return regex
+
+
+def _sub(default_pattern, text, pattern, repl):
+    """
+    Replace the matches in text with a single pass.
+
+    The precompiled default pattern is used if no pattern is given.
+    """
+    if pattern is None:
+        return default_pattern.sub(repl, text)
+
+    return re.sub(pattern=pattern, repl=repl, string=text, flags=re.DOTALL)
 
 
 class Clean:
@@ -12,19 +12,91 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-
+import asyncio
+import functools
+import logging
+import time
+import traceback
 from abc import ABC, abstractmethod
 
+from kubeagi_core.qa_provider.parser import (
+    pack_texts,
+    parse_packed_qa_lists,
+    parse_qa_list,
+)
+from kubeagi_core.qa_provider.prompt import (
+    PACKED_PROMPT_TEMPLATE,
+    PACKED_REFORMAT_PROMPT,
+    PROMPT_TEMPLATE,
+    REFORMAT_PROMPT,
+)
+from kubeagi_core.qa_provider.rate_limit import RateLimiter, estimate_tokens
+from kubeagi_core.qa_provider.retry import (
+    QAFormatError,
+    QAProviderError,
+    RetryPolicy,
+)
+
+logger = logging.getLogger(__name__)
+
 
 class BaseQAProvider(ABC):
-    """The Base class for the QA provider."""
+    """
+    The Base class for the QA provider.
+
+    The providers implement `_complete` (and `_acomplete` for a native async
+    client) to invoke the model once, and may override `_parse_qa_list` and
+    `_parse_packed_qa_lists` for their own answer formats.
+    `generate_qa_list` retries them as the retry policy says, and waits for
+    the rate limiter before each invocation, the providers may also override
+    `generate_qa_list` instead.
+    """
+
+    # the retry policy of the provider, the default one if it is not set
+    retry_policy: RetryPolicy = None
+
+    # the client-side rate limit of the invocations, no limit if it is not set
+    rate_limiter: RateLimiter = None
+
+    # the completion tokens counted against the rate limit per invocation
+    completion_tokens = 0
+
+    # the message of the failures which are not a QAProviderError
+    failure_message = "模型调用失败，请检查模型是否可用！"
 
-    @abstractmethod
     def generate_qa_list(
         self, text, prompt_template=None, retry_count=None, retry_wait_seconds=None
     ):
         """Generate the QA list.
 
+        Parameters
+        ----------
+        text
+            use the text to generate QA list
+        prompt_template
+            the prompt template
+        retry_count
+            the maximum number of invocations
+        retry_wait_seconds
+            the wait time of the first retry, it grows exponentially
+        """
+        return self._generate(
+            text,
+            prompt_template or PROMPT_TEMPLATE,
+            REFORMAT_PROMPT,
+            self._qa_list_result,
+            self._retry_policy(retry_count, retry_wait_seconds).start(),
+        )
+
+    async def agenerate_qa_list(
+        self, text, prompt_template=None, retry_count=None, retry_wait_seconds=None
+    ):
+        """Generate the QA list asynchronously.
+
+        The waits between the retries do not hold a thread. The model is
+        invoked with `_acomplete`, which runs `_complete` in the default
+        executor of the event loop if the provider has no async client.
+
         Parameters
         ----------
         text
@@ -32,3 +104,169 @@ class BaseQAProvider(ABC):
         prompt_template
             the prompt template
         """
+        return await self._agenerate(
+            text,
+            prompt_template or PROMPT_TEMPLATE,
+            REFORMAT_PROMPT,
+            self._qa_list_result,
+            self._retry_policy(retry_count, retry_wait_seconds).start(),
+        )
+
+    def generate_packed_qa_lists(
+        self, texts, prompt_template=None, retry_count=None, retry_wait_seconds=None
+    ):
+        """Generate the QA lists of several texts with one invocation.
+
+        The texts are packed into one prompt under numbered markers, and the
+        QA pairs of the answer are given back to the text of their marker.
+        The invocation is retried if no text gets any QA pair.
+
+        Parameters
+        ----------
+        texts
+            the texts to generate the QA lists
+        prompt_template
+            the packed prompt template, see `PACKED_PROMPT_TEMPLATE`
+
+        Returns
+        -------
+        the QA lists in the order of the texts as the data, the QA list
+        of a text the model skipped is empty.
+        """
+        return self._generate(
+            pack_texts(texts),
+            prompt_template or PACKED_PROMPT_TEMPLATE,
+            PACKED_REFORMAT_PROMPT,
+            functools.partial(self._packed_qa_lists_result, len(texts)),
+            self._retry_policy(retry_count, retry_wait_seconds).start(),
+        )
+
+    async def agenerate_packed_qa_lists(
+        self, texts, prompt_template=None, retry_count=None, retry_wait_seconds=None
+    ):
+        """Generate the QA lists of several texts asynchronously,
+        see `generate_packed_qa_lists`."""
+        return await self._agenerate(
+            pack_texts(texts),
+            prompt_template or PACKED_PROMPT_TEMPLATE,
+            PACKED_REFORMAT_PROMPT,
+            functools.partial(self._packed_qa_lists_result, len(texts)),
+            self._retry_policy(retry_count, retry_wait_seconds).start(),
+        )
+
+    def _generate(self, text, prompt_template, reformat_prompt, result, retry):
+        """Invoke the model until `result` accepts the answer, or give up."""
+        prompt = self._format_prompt(text, prompt_template)
+        while True:
+            try:
+                content = self._prompt(prompt, reformat_prompt, retry)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire(self._estimate_tokens(content))
+                return result(self._complete(content))
+            except Exception as ex:
+                wait = self._next_wait(retry, ex)
+            if wait is None:
+                return self._failure_result(retry)
+            time.sleep(wait)
+
+    async def _agenerate(self, text, prompt_template, reformat_prompt, result, retry):
+        """Invoke the model asynchronously, see `_generate`."""
+        prompt = self._format_prompt(text, prompt_template)
+        while True:
+            try:
+                content = self._prompt(prompt, reformat_prompt, retry)
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.aacquire(self._estimate_tokens(content))
+                return result(await self._acomplete(content))
+            except Exception as ex:
+                wait = self._next_wait(retry, ex)
+            if wait is None:
+                return self._failure_result(retry)
+            await asyncio.sleep(wait)
+
+    @abstractmethod
+    def _complete(self, content):
+        """Invoke the model once with the prompt, return the text of the answer."""
+
+    async def _acomplete(self, content):
+        """Invoke the model once asynchronously, see `_complete`."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self._complete, content)
+        )
+
+    def _parse_qa_list(self, response_text):
+        """Parse the [question, answer] list from the answer of the model."""
+        return parse_qa_list(response_text)
+
+    def _parse_packed_qa_lists(self, response_text, count):
+        """Parse the QA lists of the packed texts from the answer of the model."""
+        return parse_packed_qa_lists(response_text, count)
+
+    def _retry_policy(self, retry_count, retry_wait_seconds):
+        policy = self.retry_policy or RetryPolicy()
+        return policy.override(retry_count, retry_wait_seconds)
+
+    def _format_prompt(self, text, prompt_template):
+        """Format the prompt template, an invalid template is not retried."""
+        try:
+            return prompt_template.format(text=text)
+        except (KeyError, IndexError, ValueError) as ex:
+            raise ValueError(
+                f"Invalid prompt template, only {{text}} can be in braces: {ex!r}"
+            ) from ex
+
+    def _prompt(self, content, reformat_prompt, retry):
+        # ask for the format again, if the last answer is malformed
+        if isinstance(retry.last_error, QAFormatError):
+            content += reformat_prompt
+        logger.debug("".join([f"content.\n", f"{content}\n"]))
+        return content
+
+    def _estimate_tokens(self, content):
+        return estimate_tokens(content) + int(self.completion_tokens or 0)
+
+    def _qa_list_result(self, response_text):
+        result = self._parse_qa_list(response_text)
+        if len(result) == 0:
+            raise QAFormatError("模型调用成功，生成的QA格式不对，请更换prompt")
+        return {"status": 200, "message": "", "data": result}
+
+    def _packed_qa_lists_result(self, count, response_text):
+        qa_lists = self._parse_packed_qa_lists(response_text, count)
+        if not any(qa_lists):
+            raise QAFormatError("模型调用成功，生成的QA格式不对，请更换prompt")
+        return {"status": 200, "message": "", "data": qa_lists}
+
+    def _next_wait(self, retry, error):
+        wait = retry.next_wait(error)
+        if wait is None:
+            return None
+        if isinstance(error, QAFormatError):
+            logger.warning("failed to get QA list, retry with the format prompt")
+        else:
+            logger.warning(
+                f"model invocation failed: {error!r}, wait for {wait:.1f} seconds and retry"
+            )
+        return wait
+
+    def _failure_result(self, retry):
+        error = retry.last_error
+        logger.error(
+            "".join(
+                [
+                    f"Cannot generate the QA list after {retry.attempts} attempts.\n",
+                    f"The last error is: \n",
+                    "".join(
+                        traceback.format_exception(
+                            type(error), error, error.__traceback__
+                        )
+                    ),
+                ]
+            )
+        )
+        if isinstance(error, (QAFormatError, QAProviderError)):
+            message = str(error)
+        else:
+            message = self.failure_message
+        return {"status": 1000, "message": message, "data": []}
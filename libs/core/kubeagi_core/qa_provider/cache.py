@@ -0,0 +1,246 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from kubeagi_core.qa_provider.base import BaseQAProvider
+from kubeagi_core.qa_provider.prompt import PACKED_PROMPT_TEMPLATE, PROMPT_TEMPLATE
+
+
+class QACache:
+    """
+    On-disk QA list cache backed by SQLite.
+
+    The entries are keyed by the hash of everything which decides the
+    generated QA list, so an unchanged chunk never goes to the LLM twice.
+    When there are more than `max_entries` entries, the least recently used
+    ones are evicted.
+
+    Args:
+        path: the SQLite database file, it can be shared between processes.
+        max_entries: the maximum number of cached QA lists.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._path = path
+        self._max_entries = int(max_entries)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS qa_cache ("
+                "key TEXT PRIMARY KEY, qa_list TEXT NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS qa_cache_last_access "
+                "ON qa_cache (last_access)"
+            )
+
+    @staticmethod
+    def key(text, prompt_template, model, temperature) -> str:
+        """The cache key of a chunk, it changes with any input of the generation."""
+        data = json.dumps(
+            [text, prompt_template, model, str(temperature)], ensure_ascii=False
+        )
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Get the cached QA list, None if it is not cached."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT qa_list FROM qa_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._conn.execute(
+                "UPDATE qa_cache SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+        return json.loads(row[0])
+
+    def put(self, key: str, qa_list):
+        """Cache the QA list, then evict the least recently used entries."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO qa_cache (key, qa_list, last_access) "
+                "VALUES (?, ?, ?)",
+                (key, json.dumps(qa_list, ensure_ascii=False), time.time()),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM qa_cache").fetchone()
+            if count > self._max_entries:
+                evicted = self._conn.execute(
+                    "DELETE FROM qa_cache WHERE key IN ("
+                    "SELECT key FROM qa_cache ORDER BY last_access LIMIT ?)",
+                    (count - self._max_entries,),
+                ).rowcount
+                self._evictions += evicted
+
+    def stats(self):
+        """The cache statistics of this process, and the entries on disk."""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM qa_cache").fetchone()
+            lookups = self._hits + self._misses
+            return {
+                "path": self._path,
+                "entries": entries,
+                "max_entries": self._max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedQAProvider(BaseQAProvider):
+    """
+    Serve the QA lists from a QACache, the wrapped provider is only
+    invoked for the chunks which are not cached.
+
+    Args:
+        qa_provider: the provider to generate the QA lists.
+        cache: the QA cache.
+        model: the model name, part of the cache key.
+        temperature: the temperature, part of the cache key.
+    """
+
+    def __init__(self, qa_provider: BaseQAProvider, cache: QACache, model, temperature):
+        self.qa_provider = qa_provider
+        self.cache = cache
+        self._model = model
+        self._temperature = temperature
+
+    def _complete(self, content):
+        return self.qa_provider._complete(content)
+
+    def generate_qa_list(
+        self, text, prompt_template=None, retry_count=None, retry_wait_seconds=None
+    ):
+        """Generate the QA list, see `BaseQAProvider.generate_qa_list`."""
+        key = self._key(text, prompt_template)
+        qa_list = self.cache.get(key)
+        if qa_list is not None:
+            return {"status": 200, "message": "", "data": qa_list}
+
+        data = self.qa_provider.generate_qa_list(
+            text=text,
+            prompt_template=prompt_template,
+            retry_count=retry_count,
+            retry_wait_seconds=retry_wait_seconds,
+        )
+        self._put(key, data)
+        return data
+
+    async def agenerate_qa_list(
+        self, text, prompt_template=None, retry_count=None, retry_wait_seconds=None
+    ):
+        """Generate the QA list asynchronously, see `BaseQAProvider.agenerate_qa_list`."""
+        key = self._key(text, prompt_template)
+        qa_list = self.cache.get(key)
+        if qa_list is not None:
+            return {"status": 200, "message": "", "data": qa_list}
+
+        data = await self.qa_provider.agenerate_qa_list(
+            text=text,
+            prompt_template=prompt_template,
+            retry_count=retry_count,
+            retry_wait_seconds=retry_wait_seconds,
+        )
+        self._put(key, data)
+        return data
+
+    def generate_packed_qa_lists(
+        self, texts, prompt_template=None, retry_count=None, retry_wait_seconds=None
+    ):
+        """
+        Generate the QA lists of several texts, see
+        `BaseQAProvider.generate_packed_qa_lists`.
+
+        The QA list of each text is cached on its own, only the texts
+        which are not cached are packed into the invocation, with the
+        same prompt template, so they are cached under the same keys.
+        """
+        keys, qa_lists, missing = self._packed_lookup(texts, prompt_template)
+        if not missing:
+            return {"status": 200, "message": "", "data": qa_lists}
+
+        data = self.qa_provider.generate_packed_qa_lists(
+            texts=[texts[index] for index in missing],
+            prompt_template=prompt_template,
+            retry_count=retry_count,
+            retry_wait_seconds=retry_wait_seconds,
+        )
+        return self._packed_put(keys, qa_lists, missing, data)
+
+    async def agenerate_packed_qa_lists(
+        self, texts, prompt_template=None, retry_count=None, retry_wait_seconds=None
+    ):
+        """Generate the QA lists of several texts asynchronously,
+        see `generate_packed_qa_lists`."""
+        keys, qa_lists, missing = self._packed_lookup(texts, prompt_template)
+        if not missing:
+            return {"status": 200, "message": "", "data": qa_lists}
+
+        data = await self.qa_provider.agenerate_packed_qa_lists(
+            texts=[texts[index] for index in missing],
+            prompt_template=prompt_template,
+            retry_count=retry_count,
+            retry_wait_seconds=retry_wait_seconds,
+        )
+        return self._packed_put(keys, qa_lists, missing, data)
+
+    def _packed_lookup(self, texts, prompt_template):
+        keys = [
+            self._key(text, prompt_template or PACKED_PROMPT_TEMPLATE) for text in texts
+        ]
+        qa_lists = [self.cache.get(key) for key in keys]
+        missing = [index for index, qa_list in enumerate(qa_lists) if qa_list is None]
+        return keys, qa_lists, missing
+
+    def _packed_put(self, keys, qa_lists, missing, data):
+        if data.get("status") != 200:
+            return data
+        for index, qa_list in zip(missing, data.get("data")):
+            qa_lists[index] = qa_list
+            if len(qa_list) > 0:
+                self.cache.put(keys[index], qa_list)
+        return {"status": 200, "message": "", "data": qa_lists}
+
+    def _key(self, text, prompt_template):
+        return QACache.key(
+            text, prompt_template or PROMPT_TEMPLATE, self._model, self._temperature
+        )
+
+    def _put(self, key, data):
+        if data.get("status") == 200 and len(data.get("data")) > 0:
+            self.cache.put(key, data.get("data"))
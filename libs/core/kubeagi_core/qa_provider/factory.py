@@ -0,0 +1,111 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from typing import Any, Callable, Dict
+
+from kubeagi_core.qa_provider.base import BaseQAProvider
+from kubeagi_core.qa_provider.cache import CachedQAProvider, QACache
+from kubeagi_core.qa_provider.openai import QAProviderOpenAI
+from kubeagi_core.qa_provider.rate_limit import RateLimiter
+from kubeagi_core.qa_provider.retry import RetryPolicy
+from kubeagi_core.qa_provider.zhipuai import QAProviderZhiPuAIOnline
+
+
+def _build_openai(llm_config: Dict[str, Any]) -> BaseQAProvider:
+    return QAProviderOpenAI(
+        api_key=llm_config.get("api_key"),
+        base_url=llm_config.get("base_url"),
+        model=llm_config.get("model"),
+        temperature=llm_config.get("temperature"),
+        max_tokens=llm_config.get("max_tokens"),
+        max_connections=llm_config.get("max_concurrency"),
+        streaming=llm_config.get("streaming"),
+        stream_max_pairs=llm_config.get("stream_max_pairs"),
+        retry_policy=RetryPolicy.from_config(llm_config),
+        rate_limiter=RateLimiter.from_config(llm_config),
+    )
+
+
+def _build_zhipuai(llm_config: Dict[str, Any]) -> BaseQAProvider:
+    return QAProviderZhiPuAIOnline(
+        api_key=llm_config.get("api_key"),
+        model=llm_config.get("model"),
+        temperature=llm_config.get("temperature"),
+        top_p=llm_config.get("top_p"),
+        retry_policy=RetryPolicy.from_config(llm_config),
+        rate_limiter=RateLimiter.from_config(llm_config),
+    )
+
+
+_QA_PROVIDER_BUILDERS: Dict[str, Callable[[Dict[str, Any]], BaseQAProvider]] = {
+    "openai": _build_openai,
+    "zhipuai": _build_zhipuai,
+}
+
+
+def register_qa_provider(
+    llm_type: str, builder: Callable[[Dict[str, Any]], BaseQAProvider]
+):
+    """
+    Register a QA provider builder for the llm type.
+
+    Args:
+        llm_type: the `type` value in the llm config.
+        builder: build the QA provider from the llm config.
+    """
+    _QA_PROVIDER_BUILDERS[llm_type] = builder
+
+
+def is_supported_llm_type(llm_type: str) -> bool:
+    """Whether a QA provider is registered for the llm type."""
+    return llm_type in _QA_PROVIDER_BUILDERS
+
+
+def create_qa_provider(llm_config: Dict[str, Any]) -> BaseQAProvider:
+    """
+    Create the QA provider for the llm config.
+
+    The provider holds the HTTP connection pool and the compiled prompt,
+    build it once and share it between all the chunks of a run.
+
+    Args:
+        llm_config: llm config for generate qa, `type` selects the provider.
+            cache_path: the QA cache file, the QA lists are cached if it is set.
+            cache_max_entries: the maximum number of cached QA lists.
+    """
+    llm_type = llm_config.get("type")
+    builder = _QA_PROVIDER_BUILDERS.get(llm_type)
+    if builder is None:
+        raise ValueError(
+            f"LLM type [{llm_type}] is not supported. "
+            f"Can only be one of {list(_QA_PROVIDER_BUILDERS)}"
+        )
+
+    qa_provider = builder(llm_config)
+
+    cache_path = llm_config.get("cache_path")
+    if cache_path:
+        cache = QACache(
+            path=cache_path,
+            max_entries=llm_config.get("cache_max_entries") or 100000,
+        )
+        qa_provider = CachedQAProvider(
+            qa_provider=qa_provider,
+            cache=cache,
+            model=llm_config.get("model"),
+            temperature=llm_config.get("temperature"),
+        )
+
+    return qa_provider
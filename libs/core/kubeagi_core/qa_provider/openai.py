@@ -13,13 +13,17 @@
 # limitations under the License.
 
 
+import asyncio
 import logging
-import re
 import time
-import traceback
+import weakref
 
+import httpx
 from kubeagi_core.qa_provider.base import BaseQAProvider
-from kubeagi_core.qa_provider.prompt import PROMPT_TEMPLATE
+from kubeagi_core.qa_provider.parser import IncrementalQAParser
+from kubeagi_core.qa_provider.prompt import PROMPT_TEMPLATE, REFORMAT_PROMPT
+from kubeagi_core.qa_provider.rate_limit import RateLimiter
+from kubeagi_core.qa_provider.retry import QAFormatError, QAProviderError, RetryPolicy
 from langchain import LLMChain
 from langchain_openai import ChatOpenAI
 from langchain.prompts.chat import ChatPromptTemplate, HumanMessagePromptTemplate
@@ -30,24 +34,85 @@ logger = logging.getLogger(__name__)
 class QAProviderOpenAI(BaseQAProvider):
     """The QA provider is used by open ai."""
 
-    def __init__(self, api_key, base_url, model, temperature=None, max_tokens=None):
+    failure_message = "调用本地模型失败，请检查模型是否可用"
+
+    def __init__(
+        self,
+        api_key,
+        base_url,
+        model,
+        temperature=None,
+        max_tokens=None,
+        max_connections=None,
+        retry_policy: RetryPolicy = None,
+        rate_limiter: RateLimiter = None,
+        streaming=False,
+        stream_max_pairs=None,
+    ):
+        """
+        Args:
+            max_connections: the size of the keep-alive HTTP connection pool,
+                set it to the number of concurrent requests sharing this provider.
+            retry_policy: how the failed invocations are retried.
+            rate_limiter: the client-side rate limit of the invocations.
+            streaming: stream the answers and parse the QA pairs while they arrive,
+                a generation is stopped as soon as its answer is off the format.
+            stream_max_pairs: stop a streamed generation once it has this number
+                of QA pairs, no limit if it is None.
+        """
         if temperature is None:
             temperature = 0.8
         if max_tokens is None:
             max_tokens = 512
 
-        self.llm = ChatOpenAI(
+        limits = None
+        http_client = None
+        if max_connections is not None:
+            limits = httpx.Limits(
+                max_connections=int(max_connections),
+                max_keepalive_connections=int(max_connections),
+            )
+            http_client = httpx.Client(limits=limits)
+
+        self._llm_kwargs = dict(
             openai_api_key=api_key,
             base_url=base_url,
             model=model,
             temperature=float(temperature),
             max_tokens=int(max_tokens),
+            # the retries are done by the retry policy of the provider
+            max_retries=0,
+        )
+        self._limits = limits
+        self.llm = ChatOpenAI(http_client=http_client, **self._llm_kwargs)
+        # the prompt is formatted before the chain is invoked,
+        # so one chain serves all the prompt templates
+        prompt = ChatPromptTemplate.from_messages(
+            [HumanMessagePromptTemplate.from_template("{text}")]
+        )
+        self._llm_chain = LLMChain(prompt=prompt, llm=self.llm)
+        # the chains of the async invocations by event loop, as the connections
+        # of an async HTTP client are bound to the loop it is first used in
+        self._async_llm_chains = weakref.WeakKeyDictionary()
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        # the service counts the requested completion tokens against its limit
+        self.completion_tokens = int(max_tokens)
+        self._streaming = bool(streaming)
+        self._stream_max_pairs = (
+            int(stream_max_pairs) if stream_max_pairs is not None else None
         )
 
-    def generate_qa_list(
+    def stream_qa_pairs(
         self, text, prompt_template=None, retry_count=None, retry_wait_seconds=None
     ):
-        """Generate the QA list.
+        """Yield the QA pairs of the text as soon as they are parsed.
+
+        The answer is streamed, each invocation waits for the rate limiter.
+        Until the first pair is yielded, the failures are retried as in
+        `generate_qa_list`, an answer without any pair is retried with the
+        format prompt. Once a pair is yielded, a failure is raised as it is,
+        as the yielded pairs cannot be taken back.
 
         Parameters
         ----------
@@ -56,89 +121,99 @@ class QAProviderOpenAI(BaseQAProvider):
         prompt_template
             the prompt template
         retry_count
-            number of retries
+            the maximum number of invocations
         retry_wait_seconds
-            wait time per retry
+            the wait time of the first retry, it grows exponentially
+
+        Raises
+        ------
+        QAProviderError
+            if no QA pair can be generated.
         """
-        if prompt_template is None:
-            prompt_template = PROMPT_TEMPLATE
-        if retry_count is None:
-            retry_count = 3
-        if retry_wait_seconds is None:
-            retry_wait_seconds = 10
-
-        human_message_prompt = HumanMessagePromptTemplate.from_template(prompt_template)
-        prompt = ChatPromptTemplate.from_messages([human_message_prompt])
-        llm_chain = LLMChain(prompt=prompt, llm=self.llm)
-
-        result = []
-        status = 200
-        message = ""
-        invoke_count = 0
+        prompt = self._format_prompt(text, prompt_template or PROMPT_TEMPLATE)
+        retry = self._retry_policy(retry_count, retry_wait_seconds).start()
         while True:
+            parser = self._stream_parser()
             try:
-                if invoke_count >= int(retry_count):
-                    logger.error(
-                        "".join(
-                            [
-                                f"Cannot access the open ai service.\n",
-                                f"The tracing error is: \n{traceback.format_exc()}\n",
-                            ]
-                        )
-                    )
-
-                    status = 1000
-                    break
-
-                response = llm_chain.invoke(input=text)
-                result = self.__get_qa_list_from_response(response.get("text"))
-                if len(result) > 0:
-                    break
-
-                logger.warn("failed to get QA list, wait for 10 seconds and retry")
-                time.sleep(retry_wait_seconds)  # sleep 10 seconds
-                invoke_count += 1
-                message = "模型调用成功，生成的QA格式不对，请更换prompt"
+                content = self._prompt(prompt, REFORMAT_PROMPT, retry)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire(self._estimate_tokens(content))
+                yield from self._stream(content, parser)
+                if parser.pairs:
+                    return
+                raise QAFormatError("模型调用成功，生成的QA格式不对，请更换prompt")
             except Exception as ex:
-                time.sleep(retry_wait_seconds)
-                invoke_count += 1
-                message = "调用本地模型失败，请检查模型是否可用"
-
-        return {"status": status, "message": message, "data": result}
-
-    def __get_qa_list_from_response(self, response):
-        """Get the QA list from the response.
-
-        Notice: There are some problems in the local OpenAI service.
-        Some time it cannot return the correct question and answer list.
-
-        Parameters
-        ----------
-        response
-            the response from open ai service
-        """
-        result = []
+                if parser.pairs:
+                    raise
+                wait = self._next_wait(retry, ex)
+                if wait is None:
+                    raise QAProviderError(
+                        self._failure_result(retry)["message"]
+                    ) from ex
+            time.sleep(wait)
+
+    def _complete(self, content):
+        if not self._streaming:
+            return self._llm_chain.invoke(input=content).get("text")
+
+        parser = self._stream_parser()
+        for _ in self._stream(content, parser):
+            pass
+        return parser.text
+
+    async def _acomplete(self, content):
+        llm_chain = self._async_llm_chain()
+        if not self._streaming:
+            response = await llm_chain.ainvoke(input=content)
+            return response.get("text")
+
+        parser = self._stream_parser()
+        stream = llm_chain.llm.astream(content)
         try:
-            pattern = re.compile(r"Q\d+:(\s*)(.*?)(\s*)A\d+:(\s*)([\s\S]*?)(?=Q|$)")
-
-            # 移除换行符
-            response_text = response.replace("\\n", "")
-            matches = pattern.findall(response_text)
-
-            for match in matches:
-                q = match[1]
-                a = match[4]
-                if q and a:
-                    a = re.sub(r"[\n]", "", a).strip()
-                    result.append([q, a])
-        except Exception as ex:
-            logger.error(
-                "".join(
-                    [
-                        f"从结果中提取QA失败\n",
-                        f"The tracing error is: \n{traceback.format_exc()}\n",
-                    ]
-                )
-            )
-
-        return result
+            async for chunk in stream:
+                parser.feed(chunk.content)
+                if parser.done:
+                    self._log_stopped(parser)
+                    break
+            else:
+                parser.close()
+        finally:
+            await stream.aclose()
+        return parser.text
+
+    def _async_llm_chain(self):
+        """The chain with an async HTTP client of the running event loop."""
+        loop = asyncio.get_running_loop()
+        llm_chain = self._async_llm_chains.get(loop)
+        if llm_chain is None:
+            if self._limits is not None:
+                http_async_client = httpx.AsyncClient(limits=self._limits)
+            else:
+                http_async_client = httpx.AsyncClient()
+            llm = ChatOpenAI(http_async_client=http_async_client, **self._llm_kwargs)
+            llm_chain = LLMChain(prompt=self._llm_chain.prompt, llm=llm)
+            self._async_llm_chains[loop] = llm_chain
+        return llm_chain
+
+    def _stream(self, content, parser):
+        """Stream the answer into the parser, yield the QA pairs it completes."""
+        stream = self.llm.stream(content)
+        try:
+            for chunk in stream:
+                yield from parser.feed(chunk.content)
+                if parser.done:
+                    self._log_stopped(parser)
+                    return
+            yield from parser.close()
+        finally:
+            # the HTTP response is closed, so the model stops generating
+            stream.close()
+
+    def _stream_parser(self):
+        return IncrementalQAParser(max_pairs=self._stream_max_pairs)
+
+    def _log_stopped(self, parser):
+        if parser.off_format:
+            logger.warning("the streamed answer is off the format, stop it")
+        else:
+            logger.debug(f"stop the streamed answer after {len(parser.pairs)} QA pairs")
@@ -0,0 +1,204 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import re
+import traceback
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# a QA pair of the answer, like "Q1: question A1: answer"
+_QA_PATTERN = re.compile(r"Q\d+:(\s*)(.*?)(\s*)A\d+:(\s*)([\s\S]*?)(?=Q|$)")
+_QUESTION_PATTERN = re.compile(r"Q\d+:")
+
+# the marker of a text in a packed prompt and in its answer, like "[片段2]"
+_SECTION_MARKER = "[片段{index}]"
+_SECTION_PATTERN = re.compile(r"^[\s#*]*[\[【]\s*片段\s*(\d+)\s*[\]】]", re.MULTILINE)
+
+
+def parse_qa_list(text: str) -> List[List[str]]:
+    """Parse the [question, answer] list from the answer of the model.
+
+    Notice: There are some problems in the local models.
+    Some time they cannot return the correct question and answer list.
+
+    Parameters
+    ----------
+    text
+        the text of the answer
+    """
+    result = []
+    try:
+        # 移除换行符
+        text = text.replace("\\n", "")
+        matches = _QA_PATTERN.findall(text)
+
+        for match in matches:
+            q = match[1]
+            a = match[4]
+            if q and a:
+                a = re.sub(r"[\n]", "", a).strip()
+                result.append([q, a])
+    except Exception as ex:
+        logger.error(
+            "".join(
+                [
+                    f"从结果中提取QA失败\n",
+                    f"The tracing error is: \n{traceback.format_exc()}\n",
+                ]
+            )
+        )
+
+    return result
+
+
+def pack_texts(texts: List[str]) -> str:
+    """Join the texts into the text of one packed prompt, each under its marker."""
+    return "\n\n".join(
+        _SECTION_MARKER.format(index=index) + "\n" + text
+        for index, text in enumerate(texts, start=1)
+    )
+
+
+def parse_packed_qa_lists(text: str, count: int) -> List[List[List[str]]]:
+    """Parse the QA lists of the texts from the answer to a packed prompt.
+
+    The QA pairs belong to the text of the marker above them, the pairs
+    without a marker, or under the marker of an unknown text, are dropped.
+
+    Parameters
+    ----------
+    text
+        the text of the answer
+    count
+        the number of the packed texts
+
+    Returns
+    -------
+    the QA lists in the order of the texts, it is empty for a text the model skipped.
+    """
+    qa_lists = [[] for _ in range(count)]
+    # the markers must start a line, so restore the escaped line breaks
+    text = text.replace("\\n", "\n")
+    matches = list(_SECTION_PATTERN.finditer(text))
+    if not matches:
+        if count == 1:
+            qa_lists[0] = parse_qa_list(text)
+        return qa_lists
+
+    for position, match in enumerate(matches):
+        index = int(match.group(1)) - 1
+        if not 0 <= index < count:
+            continue
+        end = matches[position + 1].start() if position + 1 < len(matches) else None
+        qa_lists[index].extend(parse_qa_list(text[match.end() : end]))
+    return qa_lists
+
+
+class IncrementalQAParser:
+    """
+    Parse the QA pairs of the answer of the model while it is streamed,
+    the pairs are the same as `parse_qa_list` of the whole answer.
+
+    A pair is complete once the next question starts, or the answer ends.
+    The parser is done early, and the rest of the answer is not needed,
+    once `max_pairs` pairs are parsed, or if no question starts within the
+    first `max_preamble_chars` characters, as the answer is off the format.
+    The answers of the packed prompts are not capped by `max_pairs`.
+
+    Args:
+        max_pairs: stop after this number of pairs, no limit if it is None.
+        max_preamble_chars: the maximum characters before the first question.
+    """
+
+    def __init__(self, max_pairs: int = None, max_preamble_chars: int = 500):
+        self._max_pairs = max_pairs
+        self._max_preamble_chars = max_preamble_chars
+        self._chunks = []
+        # the answer without the escaped line breaks, as `parse_qa_list` does
+        self._text = ""
+        # a trailing backslash, which may escape the first letter of the next chunk
+        self._pending = ""
+        # the end of the last complete pair in the text
+        self._position = 0
+        self._started = False
+        self._packed = False
+        self._capped = False
+        self.pairs = []
+        self.done = False
+        self.off_format = False
+
+    @property
+    def text(self) -> str:
+        """The answer received so far, it ends after the last pair if capped."""
+        if self._capped:
+            return self._text[: self._position]
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> List[List[str]]:
+        """Add a chunk of the answer, return the pairs completed by it."""
+        if self.done or not chunk:
+            return []
+        self._chunks.append(chunk)
+        chunk = self._pending + chunk
+        self._pending = ""
+        if chunk.endswith("\\"):
+            chunk, self._pending = chunk[:-1], "\\"
+        self._text += chunk.replace("\\n", "")
+        return self._parse(final=False)
+
+    def close(self) -> List[List[str]]:
+        """End the answer, return the last pairs."""
+        if self.done:
+            return []
+        self._text += self._pending
+        self._pending = ""
+        pairs = self._parse(final=True)
+        self.done = True
+        return pairs
+
+    def _parse(self, final):
+        if not self._started:
+            # the markers of a packed answer come before its first question
+            self._packed = _SECTION_PATTERN.search(self._text) is not None
+            self._started = _QUESTION_PATTERN.search(self._text) is not None
+            if not self._started:
+                if len(self._text.strip()) > self._max_preamble_chars:
+                    self.done = True
+                    self.off_format = True
+                return []
+
+        pairs = []
+        for match in _QA_PATTERN.finditer(self._text, self._position):
+            # the answer ends at the next question, else it may go on in the next chunk
+            next_question = self._text[match.end() : match.end() + 1] == "Q"
+            if not (next_question or final):
+                break
+            self._position = match.end()
+            q = match.group(2)
+            a = match.group(5)
+            if not (q and a):
+                continue
+            pairs.append([q, re.sub(r"[\n]", "", a).strip()])
+            self.pairs.append(pairs[-1])
+            if (
+                self._max_pairs
+                and not self._packed
+                and len(self.pairs) >= self._max_pairs
+            ):
+                self.done = True
+                self._capped = True
+                break
+        return pairs
@@ -17,3 +17,19 @@ PROMPT_TEMPLATE = """{text}
 
 请将上述内容按照问答的方式，提出不超过 25 个问题，并给出每个问题的答案，每个问题必须有 Q 和对应的 A，并严格按照以下方式展示：\n  Q1: 问题。\n  A1: 答案。\n  Q2: 问题。\n  A2: 答案。\n注意，尽可能多的提出问题，但是 Q 不要重复，也不要出现只有 Q 没有 A 的情况。
 """
+
+# appended to the prompt when the previous answer could not be parsed
+REFORMAT_PROMPT = """
+上一次的回答格式不正确，无法解析。请只输出问答对，每个问题以 Q 加序号和英文冒号开头，每个答案以 A 加序号和英文冒号开头，例如：\n  Q1: 问题。\n  A1: 答案。
+"""
+
+# the prompt of several texts packed into one request, see `parser.pack_texts`
+PACKED_PROMPT_TEMPLATE = """{text}
+
+以上内容由若干个片段组成，每个片段以 [片段序号] 开头。请分别针对每个片段，按照问答的方式，提出不超过 25 个问题，并给出每个问题的答案，问题和答案只能来自该片段。先输出片段的序号，再输出该片段的问答对，每个问题必须有 Q 和对应的 A，并严格按照以下方式展示：\n  [片段1]\n  Q1: 问题。\n  A1: 答案。\n  Q2: 问题。\n  A2: 答案。\n  [片段2]\n  Q1: 问题。\n  A1: 答案。\n注意，不要遗漏任何片段，尽可能多的提出问题，但是 Q 不要重复，也不要出现只有 Q 没有 A 的情况。
+"""
+
+# appended to the packed prompt when the previous answer could not be parsed
+PACKED_REFORMAT_PROMPT = """
+上一次的回答格式不正确，无法解析。请对每个片段先输出一行 [片段序号]，再输出该片段的问答对，每个问题以 Q 加序号和英文冒号开头，每个答案以 A 加序号和英文冒号开头，例如：\n  [片段1]\n  Q1: 问题。\n  A1: 答案。
+"""
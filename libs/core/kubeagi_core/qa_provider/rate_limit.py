@@ -0,0 +1,250 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# the CJK characters, each of them is about one token
+_CJK_RANGES = (
+    (0x3040, 0x30FF),
+    (0x3400, 0x4DBF),
+    (0x4E00, 0x9FFF),
+    (0xAC00, 0xD7AF),
+    (0xF900, 0xFAFF),
+    (0xFF00, 0xFFEF),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of the text without a tokenizer.
+
+    A CJK character is counted as one token, the other characters as
+    a quarter of a token, which is close to the BPE tokenizers of the
+    common models and errs on the high side.
+    """
+    cjk = 0
+    for char in text:
+        code = ord(char)
+        if code >= 0x3040 and any(low <= code <= high for low, high in _CJK_RANGES):
+            cjk += 1
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class RateLimiter:
+    """
+    Client-side token bucket rate limiter of the LLM invocations.
+
+    There is a bucket for the requests per minute and one for the tokens per
+    minute, each of them holds up to one minute of its limit and refills at
+    the limit. An invocation takes one request and its estimated tokens from
+    both buckets and waits until they are paid back, the buckets may go below
+    zero, so that the waiting invocations take their turns in order instead
+    of waking up together.
+
+    The buckets are in memory and shared by the threads and the coroutines
+    of the process, see `SQLiteRateLimiter` to share them between processes.
+
+    Args:
+        requests_per_minute: the maximum number of invocations per minute,
+            no limit if it is None.
+        tokens_per_minute: the maximum number of prompt and completion
+            tokens per minute, no limit if it is None.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        self._limits = {}
+        if requests_per_minute:
+            self._limits["requests"] = float(requests_per_minute)
+        if tokens_per_minute:
+            self._limits["tokens"] = float(tokens_per_minute)
+        # the buckets by name, as [level, time of the level]
+        self._buckets = {
+            name: [limit, time.time()] for name, limit in self._limits.items()
+        }
+        self._lock = threading.Lock()
+        self._waits = 0
+        self._wait_seconds = 0.0
+
+    @classmethod
+    def from_config(cls, llm_config: Dict[str, Any]) -> Optional["RateLimiter"]:
+        """
+        Build the rate limiter from the llm config.
+
+        Args:
+            llm_config: llm config for generate qa.
+                rate_limit_rpm: the maximum number of invocations per minute.
+                rate_limit_tpm: the maximum number of tokens per minute.
+                rate_limit_path: the SQLite file to share the limits between
+                    the processes, they are only in memory if it is not set.
+
+        Returns:
+            the rate limiter, None if there is no limit.
+        """
+        requests_per_minute = llm_config.get("rate_limit_rpm")
+        tokens_per_minute = llm_config.get("rate_limit_tpm")
+        if not requests_per_minute and not tokens_per_minute:
+            return None
+
+        path = llm_config.get("rate_limit_path")
+        if path:
+            return SQLiteRateLimiter(
+                path=path,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+            )
+        return cls(
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+        )
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Take one request and the tokens from the buckets.
+
+        Returns:
+            the seconds to wait before the invocation.
+        """
+        costs = self._costs(tokens)
+        if not costs:
+            return 0.0
+        with self._lock:
+            wait = self._take(self._buckets, costs, time.time())
+        self._record(wait)
+        return wait
+
+    def acquire(self, tokens: int = 0):
+        """Wait until the invocation with the tokens is allowed."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0):
+        """Wait asynchronously until the invocation with the tokens is allowed."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        """How often and how long the invocations have waited."""
+        return {"waits": self._waits, "wait_seconds": round(self._wait_seconds, 3)}
+
+    def _costs(self, tokens):
+        costs = []
+        if "requests" in self._limits:
+            costs.append(("requests", 1.0))
+        if "tokens" in self._limits:
+            # an invocation larger than the bucket would never fit in it
+            costs.append(("tokens", min(float(tokens), self._limits["tokens"])))
+        return costs
+
+    def _take(self, buckets, costs: List[Tuple[str, float]], now) -> float:
+        """Refill the buckets to now and take the costs from them."""
+        wait = 0.0
+        for name, cost in costs:
+            limit = self._limits[name]
+            rate = limit / 60
+            level, updated = buckets[name]
+            level = min(limit, level + max(now - updated, 0.0) * rate) - cost
+            buckets[name] = [level, now]
+            if level < 0:
+                wait = max(wait, -level / rate)
+        return wait
+
+    def _record(self, wait):
+        if wait <= 0:
+            return
+        self._waits += 1
+        self._wait_seconds += wait
+        logger.debug(f"rate limited, wait for {wait:.2f} seconds")
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """
+    The rate limiter with the buckets in a SQLite file, so that all the
+    processes using the same file share the limits, e.g. the concurrent
+    batch conversions against one model service.
+
+    Args:
+        path: the SQLite database file.
+        requests_per_minute: the maximum number of invocations per minute.
+        tokens_per_minute: the maximum number of tokens per minute.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        super().__init__(
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+        )
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._path = path
+        # the transactions are begun explicitly
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit ("
+                "name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def reserve(self, tokens: int = 0) -> float:
+        costs = self._costs(tokens)
+        if not costs:
+            return 0.0
+        # the buckets are named by their limits, so the processes
+        # with different limits do not drain each other's buckets
+        names = {name: f"{name}:{self._limits[name]:g}" for name, _ in costs}
+        with self._lock:
+            # take the write lock before reading, the read and the
+            # update of the buckets are atomic between the processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                buckets = {}
+                for name, key in names.items():
+                    row = self._conn.execute(
+                        "SELECT level, updated FROM rate_limit WHERE name = ?", (key,)
+                    ).fetchone()
+                    buckets[name] = list(row) if row else [self._limits[name], now]
+                wait = self._take(buckets, costs, now)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO rate_limit (name, level, updated) "
+                    "VALUES (?, ?, ?)",
+                    [(names[name], *buckets[name]) for name in names],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._record(wait)
+        return wait
@@ -0,0 +1,252 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import email.utils
+import functools
+import random
+import time
+from typing import Any, Dict, Optional, Tuple, Type
+
+# the HTTP status codes worth retrying, the other 4xx are not going to change
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class QAFormatError(Exception):
+    """The model answered, but no QA pair could be parsed from the answer."""
+
+
+class QAProviderError(Exception):
+    """
+    The model service reported an error, the message is shown to the user.
+
+    Args:
+        message: the message of the error.
+        status_code: the HTTP status code the error is equivalent to, e.g. 429
+            for a rate limit reported in the response body, it is retried as
+            the HTTP error with the status code. Not retried if it is None.
+    """
+
+    def __init__(self, message: str = "", status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RetryPolicy:
+    """
+    When and how long to wait before retrying a QA generation.
+
+    The transport errors and the retryable HTTP status codes are retried with
+    exponential backoff and full jitter, the waiting time is the `Retry-After`
+    header instead if the service sends one, e.g. with a 429. A malformed
+    answer is retried at once, as waiting does not make the model answer better.
+    The other errors, like a 401 or a service error code, are not retried,
+    except the service errors with a retryable status code, like a rate limit.
+
+    Args:
+        max_attempts: the maximum number of invocations, including the first one.
+        initial_wait_seconds: the backoff of the first retry.
+        max_wait_seconds: the maximum backoff of a retry.
+        multiplier: the backoff grows by this factor after each retry.
+        jitter: wait a random time between 0 and the backoff, so that the
+            concurrent requests failing together do not retry together.
+        max_elapsed_seconds: give up once a retry would end after this time
+            since the first invocation, no limit if it is None.
+        format_retry_wait_seconds: the waiting time before retrying a malformed answer.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        initial_wait_seconds: float = 2.0,
+        max_wait_seconds: float = 60.0,
+        multiplier: float = 2.0,
+        jitter: bool = True,
+        max_elapsed_seconds: Optional[float] = 600.0,
+        format_retry_wait_seconds: float = 0.0,
+    ):
+        self.max_attempts = int(max_attempts)
+        self.initial_wait_seconds = float(initial_wait_seconds)
+        self.max_wait_seconds = float(max_wait_seconds)
+        self.multiplier = float(multiplier)
+        self.jitter = jitter
+        self.max_elapsed_seconds = max_elapsed_seconds
+        self.format_retry_wait_seconds = float(format_retry_wait_seconds)
+
+    @classmethod
+    def from_config(cls, llm_config: Dict[str, Any]) -> "RetryPolicy":
+        """
+        Build the policy from the llm config.
+
+        Args:
+            llm_config: llm config for generate qa.
+                retry_count: the maximum number of invocations.
+                retry_wait_seconds: the backoff of the first retry.
+                retry_max_wait_seconds: the maximum backoff of a retry.
+                retry_max_elapsed_seconds: the maximum time of the retries.
+        """
+        policy = cls()
+        if llm_config.get("retry_max_wait_seconds") is not None:
+            policy.max_wait_seconds = float(llm_config["retry_max_wait_seconds"])
+        if llm_config.get("retry_max_elapsed_seconds") is not None:
+            policy.max_elapsed_seconds = float(llm_config["retry_max_elapsed_seconds"])
+        return policy.override(
+            retry_count=llm_config.get("retry_count"),
+            retry_wait_seconds=llm_config.get("retry_wait_seconds"),
+        )
+
+    def override(
+        self, retry_count: int = None, retry_wait_seconds: float = None
+    ) -> "RetryPolicy":
+        """A copy of the policy with the retry arguments of a call."""
+        if retry_count is None and retry_wait_seconds is None:
+            return self
+        policy = RetryPolicy(**vars(self))
+        if retry_count is not None:
+            policy.max_attempts = int(retry_count)
+        if retry_wait_seconds is not None:
+            policy.initial_wait_seconds = float(retry_wait_seconds)
+        return policy
+
+    def start(self) -> "RetryState":
+        """Start the retries of a call."""
+        return RetryState(self)
+
+    def backoff(self, retries: int) -> float:
+        wait = min(
+            self.initial_wait_seconds * self.multiplier**retries,
+            self.max_wait_seconds,
+        )
+        if self.jitter:
+            wait = random.uniform(0, wait)
+        return wait
+
+
+class RetryState:
+    """The retries of a call, see `RetryPolicy`."""
+
+    def __init__(self, policy: RetryPolicy):
+        self._policy = policy
+        self._start = time.monotonic()
+        self.attempts = 0
+        self._transport_retries = 0
+        self.last_error = None
+
+    def next_wait(self, error: Exception) -> Optional[float]:
+        """
+        Record the failed attempt.
+
+        Returns:
+            the seconds to wait before the next attempt, None to give up.
+        """
+        self.attempts += 1
+        self.last_error = error
+        policy = self._policy
+        if self.attempts >= policy.max_attempts or not is_retryable(error):
+            return None
+
+        if isinstance(error, QAFormatError):
+            wait = policy.format_retry_wait_seconds
+        else:
+            wait = retry_after_seconds(error)
+            if wait is None:
+                wait = policy.backoff(self._transport_retries)
+            self._transport_retries += 1
+
+        if policy.max_elapsed_seconds is not None:
+            elapsed = time.monotonic() - self._start
+            if elapsed + wait > policy.max_elapsed_seconds:
+                return None
+        return wait
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    The malformed answers, the transport errors and the HTTP or service errors
+    with a retryable status code are retryable. The other errors, like a service
+    error reported in the response without a status code or a bug, fail at once.
+    """
+    if isinstance(error, QAFormatError):
+        return True
+    status_code = _status_code(error)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, _transport_errors())
+
+
+@functools.lru_cache(maxsize=None)
+def _transport_errors() -> Tuple[Type[BaseException], ...]:
+    """The connection and timeout errors of the HTTP clients which are installed."""
+    errors = [ConnectionError, TimeoutError, asyncio.TimeoutError]
+    try:
+        import httpx
+
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        import requests
+
+        errors.extend([requests.ConnectionError, requests.Timeout])
+    except ImportError:
+        pass
+    try:
+        import openai
+
+        # APITimeoutError is a subclass of APIConnectionError
+        errors.append(openai.APIConnectionError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """The `Retry-After` of the HTTP response of the error, in seconds."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(float(value) / 1000, 0.0)
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - time.time(), 0.0)
+
+
+def _status_code(error):
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code
+    # a requests response is falsy for the error status codes
+    response = getattr(error, "response", None)
+    if response is not None:
+        status_code = getattr(response, "status_code", None)
+        if isinstance(status_code, int):
+            return status_code
+    return None
@@ -13,141 +13,121 @@
 # limitations under the License.
 
 
+import asyncio
 import logging
-import re
-import time
-import traceback
+import posixpath
+import weakref
 
+import httpx
+import requests
 import zhipuai
+from zhipuai.utils import jwt_token
 from kubeagi_core.qa_provider.base import BaseQAProvider
-from kubeagi_core.qa_provider.prompt import PROMPT_TEMPLATE
+from kubeagi_core.qa_provider.rate_limit import RateLimiter
+from kubeagi_core.qa_provider.retry import QAProviderError, RetryPolicy
 
 logger = logging.getLogger(__name__)
 
+# the error codes of the rate and concurrency limits, they are reported
+# in the response body with HTTP 200 and retried as an HTTP 429
+_RATE_LIMIT_CODES = {1302, 1303, 1305}
+
 
 class QAProviderZhiPuAIOnline(BaseQAProvider):
     """The QA provider is used by zhi pu ai online."""
 
-    def __init__(self, api_key, model, temperature=None, top_p=None):
+    def __init__(
+        self,
+        api_key,
+        model,
+        temperature=None,
+        top_p=None,
+        retry_policy: RetryPolicy = None,
+        rate_limiter: RateLimiter = None,
+    ):
         if top_p is None:
-            self._top_p = 0.7
+            top_p = 0.7
         if temperature is None:
-            self._temperature = 0.8
+            temperature = 0.8
+        self._top_p = top_p
+        self._temperature = temperature
         self._model = model
+        self._api_key = api_key
 
         zhipuai.api_key = api_key
-
-    def generate_qa_list(
-        self, text, prompt_template=None, retry_count=None, retry_wait_seconds=None
-    ):
-        """Generate the QA list.
-
-        Parameters
-        ----------
-        text
-            use the text to generate QA list
-        prompt_template
-            the prompt template
-        retry_count
-            number of retries
-        retry_wait_seconds
-            wait time per retry
-        """
-        if prompt_template is None:
-            prompt_template = PROMPT_TEMPLATE
-        if retry_count is None:
-            retry_count = 3
-        if retry_wait_seconds is None:
-            retry_wait_seconds = 120
-
-        content = prompt_template.format(text=text)
-
-        result = []
-        status = 200
-        message = ""
-
-        invoke_count = 0
-        while True:
-            logger.debug("".join([f"content.\n", f"{content}\n"]))
-            try:
-                if invoke_count >= int(retry_count):
-                    logger.error(
-                        "".join(
-                            [
-                                f"Cannot access the open ai service.\n",
-                                f"The tracing error is: \n{traceback.format_exc()}\n",
-                            ]
-                        )
-                    )
-
-                    status = 1000
-                    break
-
-                response = zhipuai.model_api.invoke(
-                    model=self._model,
-                    prompt=[{"role": "user", "content": content}],
-                    top_p=float(self._top_p),
-                    temperature=float(self._temperature),
-                )
-                if response["success"]:
-                    result = self.__format_response_to_qa_list(response)
-                    if len(result) > 0:
-                        break
-
-                    logger.warn(
-                        f"failed to get QA list, wait for {retry_wait_seconds} seconds and retry"
-                    )
-                    time.sleep(retry_wait_seconds)  # sleep 120 seconds
-                    invoke_count += 1
-                    message = "模型调用成功，生成的QA格式不对，请更换prompt"
-                else:
-                    logger.error(
-                        "".join(
-                            [
-                                f"Cannot access the ZhiPuAI service.\n",
-                                f"The error is: \n{response['msg']}\n",
-                            ]
-                        )
-                    )
-                    logger.warn(
-                        f"zhipuai request failed, wait for {retry_wait_seconds} seconds and retry"
-                    )
-                    time.sleep(retry_wait_seconds)  # sleep 120 seconds
-                    invoke_count += 1
-                    message = "模型调用失败，失败原因: " + response["msg"]
-            except Exception as ex:
-                logger.warn(
-                    f"zhipuai request exception, wait for {retry_wait_seconds} seconds and retry"
-                )
-                time.sleep(retry_wait_seconds)
-                invoke_count += 1
-                message = "模型调用失败，请检查模型是否可用！"
-
-        return {"status": status, "message": message, "data": result}
-
-    def __format_response_to_qa_list(self, response):
-        """Format the response to the QA list."""
-        text = response["data"]["choices"][0]["content"]
-        result = []
-        try:
-            pattern = re.compile(r"Q\d+:(\s*)(.*?)(\s*)A\d+:(\s*)([\s\S]*?)(?=Q|$)")
-            # 移除换行符
-            text = text.replace("\\n", "")
-            matches = pattern.findall(text)
-
-            for match in matches:
-                q = match[1]
-                a = match[4]
-                if q and a:
-                    result.append([q, a])
-        except Exception as ex:
+        # keep the HTTP connection alive between the invocations
+        self._session = requests.Session()
+        # the async HTTP clients by event loop, as the connections of a client
+        # are bound to the loop it is first used in, e.g. by an `asyncio.run`
+        self._async_clients = weakref.WeakKeyDictionary()
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+
+    def _complete(self, content):
+        return self._response_text(self._invoke(content))
+
+    async def _acomplete(self, content):
+        return self._response_text(await self._ainvoke(content))
+
+    def _response_text(self, response):
+        if not response["success"]:
             logger.error(
                 "".join(
                     [
-                        f"从结果中提取QA失败\n",
-                        f"The tracing error is: \n{traceback.format_exc()}\n",
+                        f"Cannot access the ZhiPuAI service.\n",
+                        f"The error is: \n{response['msg']}\n",
                     ]
                 )
             )
-
-        return result
+            status_code = 429 if _error_code(response) in _RATE_LIMIT_CODES else None
+            raise QAProviderError(
+                "模型调用失败，失败原因: " + response["msg"], status_code=status_code
+            )
+        return response["data"]["choices"][0]["content"]
+
+    def _invoke(self, content):
+        """Invoke the ZhiPuAI model api with the pooled HTTP session."""
+        resp = self._session.post(
+            url=posixpath.join(zhipuai.model_api_url, self._model, "invoke"),
+            json={
+                "prompt": [{"role": "user", "content": content}],
+                "top_p": float(self._top_p),
+                "temperature": float(self._temperature),
+            },
+            headers={"Authorization": jwt_token.generate_token(self._api_key)},
+            timeout=zhipuai.api_timeout_seconds,
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    async def _ainvoke(self, content):
+        """Invoke the ZhiPuAI model api with the pooled async HTTP client."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(timeout=zhipuai.api_timeout_seconds)
+            self._async_clients[loop] = client
+        resp = await client.post(
+            url=posixpath.join(zhipuai.model_api_url, self._model, "invoke"),
+            json={
+                "prompt": [{"role": "user", "content": content}],
+                "top_p": float(self._top_p),
+                "temperature": float(self._temperature),
+            },
+            headers={"Authorization": jwt_token.generate_token(self._api_key)},
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+
+def _error_code(response):
+    """The error code of the response body, e.g. {"code": 1302, "msg": ...}
+    or {"error": {"code": "1302", "message": ...}}."""
+    code = response.get("code")
+    error = response.get("error")
+    if isinstance(error, dict) and error.get("code") is not None:
+        code = error["code"]
+    try:
+        return int(code)
+    except (TypeError, ValueError):
+        return None
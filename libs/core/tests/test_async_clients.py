@@ -0,0 +1,95 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import httpx
+from kubeagi_core.qa_provider import openai as openai_module
+from kubeagi_core.qa_provider import zhipuai as zhipuai_module
+from kubeagi_core.qa_provider.openai import QAProviderOpenAI
+from kubeagi_core.qa_provider.zhipuai import QAProviderZhiPuAIOnline
+
+ANSWER = "Q1: 什么是大语言模型？\nA1: 使用大量文本数据训练的深度学习模型。"
+
+
+def _openai_response(request):
+    return httpx.Response(
+        200,
+        json={
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "test",
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": ANSWER},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        },
+    )
+
+
+def _zhipuai_response(request):
+    return httpx.Response(
+        200,
+        json={"code": 200, "success": True, "data": {"choices": [{"content": ANSWER}]}},
+    )
+
+
+def _mock_async_clients(monkeypatch, module, handler):
+    """Record the async HTTP clients of the module, they answer with the handler."""
+    clients = []
+
+    class MockAsyncClient(httpx.AsyncClient):
+        def __init__(self, **kwargs):
+            super().__init__(transport=httpx.MockTransport(handler), **kwargs)
+            clients.append(self)
+
+    monkeypatch.setattr(module.httpx, "AsyncClient", MockAsyncClient)
+    return clients
+
+
+def test_openai_provider_across_event_loops(monkeypatch):
+    clients = _mock_async_clients(monkeypatch, openai_module, _openai_response)
+    provider = QAProviderOpenAI(
+        api_key="sk-test", base_url="http://localhost:8000/v1", model="test"
+    )
+
+    async def generate_twice():
+        return [await provider.agenerate_qa_list("文本") for _ in range(2)]
+
+    for _ in range(2):
+        results = asyncio.run(generate_twice())
+        assert [res["status"] for res in results] == [200, 200]
+
+    # a client for each event loop, reused within the loop
+    assert len(clients) == 2
+
+
+def test_zhipuai_provider_across_event_loops(monkeypatch):
+    clients = _mock_async_clients(monkeypatch, zhipuai_module, _zhipuai_response)
+    provider = QAProviderZhiPuAIOnline(api_key="id.secret", model="chatglm_turbo")
+
+    async def generate_twice():
+        return [await provider.agenerate_qa_list("文本") for _ in range(2)]
+
+    for _ in range(2):
+        results = asyncio.run(generate_twice())
+        assert [res["status"] for res in results] == [200, 200]
+
+    # a client for each event loop, reused within the loop
+    assert len(clients) == 2
@@ -0,0 +1,71 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import threading
+import time
+
+from kubeagi_core.document_transformers import batch, document2csv
+from kubeagi_core.document_transformers.batch import Batch2CSVTransform
+
+
+class SlowQAProvider:
+    """Answer after a while, and record the most generations at the same time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def generate_qa_list(self, text, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self._lock:
+            self.in_flight -= 1
+        return {"status": 200, "message": "", "data": [["q " + text, "a"]]}
+
+
+def test_small_files_share_the_llm_concurrency(tmp_path, monkeypatch):
+    provider = SlowQAProvider()
+    # no LLM and no spacy model, the documents are the chunks
+    monkeypatch.setattr(batch, "create_qa_provider", lambda config: provider)
+    monkeypatch.setattr(
+        document2csv.Document2CSVTransform,
+        "_split_documents",
+        lambda self, documents: documents,
+    )
+    file_paths = []
+    for index in range(8):
+        path = tmp_path / "input" / f"file{index}.txt"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(f"content {index}", encoding="utf-8")
+        file_paths.append(str(path))
+    output_dir = tmp_path / "output"
+
+    res = Batch2CSVTransform(
+        file_paths=file_paths,
+        llm_config={"type": "openai", "max_concurrency": 4},
+        output_dir=str(output_dir),
+        num_workers=1,
+    ).transform()
+
+    assert res["status"] == 200
+    # one chunk per file, the files are generated together
+    assert 1 < provider.max_in_flight <= 4
+    manifest = json.loads((output_dir / "manifest.json").read_text())
+    assert [item["file"] for item in manifest] == file_paths
+    assert [item["file"] for item in res["data"]] == file_paths
+    assert all(item["qa_count"] == 1 for item in manifest)
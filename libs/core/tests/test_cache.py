@@ -0,0 +1,97 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+
+from kubeagi_core.qa_provider import cache as cache_module
+from kubeagi_core.qa_provider.base import BaseQAProvider
+from kubeagi_core.qa_provider.cache import CachedQAProvider, QACache
+from kubeagi_core.qa_provider.retry import RetryPolicy
+
+
+class FakeQAProvider(BaseQAProvider):
+    """Answer one QA pair about the prompt, and count the invocations."""
+
+    def __init__(self):
+        self.prompts = []
+        self.retry_policy = RetryPolicy(max_attempts=1)
+
+    def _complete(self, content):
+        self.prompts.append(content)
+        return f"Q1: 问题{len(self.prompts)}\nA1: 答案{len(self.prompts)}"
+
+
+def _cached_provider(tmp_path, **kwargs):
+    cache = QACache(str(tmp_path / "qa_cache.db"), **kwargs)
+    provider = FakeQAProvider()
+    return CachedQAProvider(provider, cache, model="glm", temperature=0.8), provider
+
+
+def test_cache_hit_skips_the_model(tmp_path):
+    cached, provider = _cached_provider(tmp_path)
+
+    first = cached.generate_qa_list("文本")
+    second = cached.generate_qa_list("文本")
+
+    assert first == second == {"status": 200, "message": "", "data": [["问题1", "答案1"]]}
+    assert len(provider.prompts) == 1
+    assert cached.cache.stats()["hits"] == 1
+
+
+def test_cache_key_changes_with_the_inputs(tmp_path):
+    cached, provider = _cached_provider(tmp_path)
+
+    cached.generate_qa_list("文本")
+    cached.generate_qa_list("文本", prompt_template="另一个模板 {text}")
+    CachedQAProvider(provider, cached.cache, "glm", 0.2).generate_qa_list("文本")
+
+    assert len(provider.prompts) == 3
+
+
+def test_failures_are_not_cached(tmp_path):
+    cached, provider = _cached_provider(tmp_path)
+    provider._complete = lambda content: "no pairs"
+
+    assert cached.generate_qa_list("文本")["status"] == 1000
+    assert cached.cache.stats()["entries"] == 0
+
+
+def test_cache_is_shared_through_the_file(tmp_path):
+    cached, _ = _cached_provider(tmp_path)
+    cached.generate_qa_list("文本")
+    cached.cache.close()
+
+    reopened, provider = _cached_provider(tmp_path)
+
+    assert reopened.generate_qa_list("文本")["data"] == [["问题1", "答案1"]]
+    assert provider.prompts == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = itertools.count(1)
+    monkeypatch.setattr(cache_module.time, "time", lambda: float(next(clock)))
+    cache = QACache(str(tmp_path / "qa_cache.db"), max_entries=2)
+
+    cache.put("a", [["qa", "aa"]])
+    cache.put("b", [["qb", "ab"]])
+    # a is used after b, so b is the least recently used
+    assert cache.get("a") == [["qa", "aa"]]
+    cache.put("c", [["qc", "ac"]])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == [["qa", "aa"]]
+    assert cache.get("c") == [["qc", "ac"]]
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
@@ -0,0 +1,190 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import os
+import threading
+import time
+
+from kubeagi_core.document_transformers.document2csv import (
+    Document2CSVTransform,
+    _ordered_map,
+)
+from langchain_core.documents import Document
+
+
+class FakeQAProvider:
+    """Answer one QA pair per chunk, and fail on the chunks in `fail_on`."""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.texts = []
+
+    def generate_qa_list(self, text, **kwargs):
+        self.texts.append(text)
+        if text in self.fail_on:
+            return {"status": 1000, "message": "模型调用失败", "data": []}
+        return {"status": 200, "message": "", "data": [["q " + text, "a " + text]]}
+
+
+def _chunks(count):
+    for index in range(count):
+        content = f"chunk {index}"
+        yield Document(page_content=content, metadata={"page": index}), content
+
+
+def _transform(tmp_path, **llm_config):
+    return Document2CSVTransform(
+        file_path=str(tmp_path / "file.pdf"),
+        llm_config={"type": "openai", **llm_config},
+        output_dir=str(tmp_path),
+    )
+
+
+def _csv_rows(tmp_path):
+    with open(tmp_path / "file.csv", newline="") as file:
+        return list(csv.reader(file))
+
+
+def test_resume_from_checkpoint(tmp_path):
+    failing = FakeQAProvider(fail_on={"chunk 30"})
+    res = _transform(tmp_path)._transform_chunks(_chunks(50), qa_provider=failing)
+    assert res["status"] == 1000
+    assert os.path.exists(tmp_path / "file.csv.checkpoint")
+
+    provider = FakeQAProvider()
+    res = _transform(tmp_path)._transform_chunks(_chunks(50), qa_provider=provider)
+
+    assert res["status"] == 200
+    # only the chunks from the failed one on are generated again
+    assert provider.texts == [f"chunk {index}" for index in range(30, 50)]
+    # the header and the rows of all the chunks, also the resumed ones
+    assert len(res["data"]) == 51
+    assert [row[0] for row in res["data"][1:]] == [
+        f"q chunk {index}" for index in range(50)
+    ]
+    assert len(_csv_rows(tmp_path)) == 51
+    assert not os.path.exists(tmp_path / "file.csv.checkpoint")
+
+
+def test_resume_drops_rows_of_unmarked_chunk(tmp_path):
+    failing = FakeQAProvider(fail_on={"chunk 3"})
+    _transform(tmp_path)._transform_chunks(_chunks(5), qa_provider=failing)
+    # a crash after the rows of a chunk are written, before it is marked as done
+    with open(tmp_path / "file.csv", "a", newline="") as file:
+        csv.writer(file).writerow(["q chunk 3", "a chunk 3", "", "3", "chunk 3"])
+
+    provider = FakeQAProvider()
+    res = _transform(tmp_path)._transform_chunks(_chunks(5), qa_provider=provider)
+
+    assert res["status"] == 200
+    rows = _csv_rows(tmp_path)
+    assert [row[0] for row in rows[1:]] == [f"q chunk {index}" for index in range(5)]
+
+
+def test_checkpoint_of_another_config_starts_over(tmp_path):
+    failing = FakeQAProvider(fail_on={"chunk 3"})
+    _transform(tmp_path, temperature=0.8)._transform_chunks(
+        _chunks(5), qa_provider=failing
+    )
+
+    provider = FakeQAProvider()
+    res = _transform(tmp_path, temperature=0.2)._transform_chunks(
+        _chunks(5), qa_provider=provider
+    )
+
+    assert res["status"] == 200
+    assert len(provider.texts) == 5
+    assert len(_csv_rows(tmp_path)) == 6
+
+
+def test_ordered_map_keeps_order_and_bounds_concurrency():
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def slow_square(item):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        # the later items complete first
+        time.sleep(0.01 * (10 - item))
+        with lock:
+            in_flight[0] -= 1
+        return item * item
+
+    results = list(_ordered_map(slow_square, range(10), max_concurrency=3))
+
+    assert results == [item * item for item in range(10)]
+    assert 1 < in_flight[1] <= 3
+
+
+def test_ordered_map_stops_pulling_items_when_closed():
+    pulled = []
+
+    def items():
+        for item in range(100):
+            pulled.append(item)
+            yield item
+
+    results = _ordered_map(lambda item: item, items(), max_concurrency=4)
+    assert next(results) == 0
+    results.close()
+
+    # only the items in flight are pulled ahead
+    assert len(pulled) <= 5
+
+
+def test_transform_chunks_concurrently_in_order(tmp_path):
+    provider = FakeQAProvider()
+
+    res = _transform(tmp_path, max_concurrency=8)._transform_chunks(
+        _chunks(20), qa_provider=provider
+    )
+
+    assert res["status"] == 200
+    assert [row[0] for row in res["data"][1:]] == [
+        f"q chunk {index}" for index in range(20)
+    ]
+
+
+class FakePackedQAProvider(FakeQAProvider):
+    """Answer the packs, skipping the chunks in `skip`."""
+
+    def __init__(self, skip=()):
+        super().__init__()
+        self.skip = set(skip)
+        self.packs = []
+
+    def generate_packed_qa_lists(self, texts, **kwargs):
+        self.packs.append(texts)
+        qa_lists = [
+            [] if text in self.skip else [["q " + text, "a " + text]] for text in texts
+        ]
+        return {"status": 200, "message": "", "data": qa_lists}
+
+
+def test_packed_chunks_fall_back_to_single_requests(tmp_path):
+    provider = FakePackedQAProvider(skip={"chunk 1"})
+
+    res = _transform(tmp_path, pack_max_chunks=3)._transform_chunks(
+        _chunks(5), qa_provider=provider
+    )
+
+    assert res["status"] == 200
+    assert provider.packs == [["chunk 0", "chunk 1", "chunk 2"], ["chunk 3", "chunk 4"]]
+    # the skipped chunk is asked for alone
+    assert provider.texts == ["chunk 1"]
+    assert [row[0] for row in res["data"][1:]] == [
+        f"q chunk {index}" for index in range(5)
+    ]
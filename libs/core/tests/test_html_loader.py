@@ -0,0 +1,41 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from kubeagi_core.document_loaders.html import HTMLLoader
+
+HTML = """<html>
+<head><title>标题</title><style>p { color: red; }</style></head>
+<body>
+  <h1>第一章</h1>
+  <p>第一行<br>第二行 <br/> 第三行</p>
+  <div>地址：北京<br>电话：123</div>
+  <pre>code
+    indented</pre>
+  <script>alert(1)</script>
+</body>
+</html>
+"""
+
+
+def test_html_text(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text(HTML, encoding="utf-8")
+
+    documents = HTMLLoader(str(path)).load()
+
+    assert len(documents) == 1
+    assert documents[0].metadata == {"source": "page.html", "title": "标题"}
+    assert documents[0].page_content == "\n\n".join(
+        ["第一章", "第一行\n第二行\n第三行", "地址：北京\n电话：123", "code\n    indented"]
+    )
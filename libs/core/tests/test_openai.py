@@ -0,0 +1,111 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import types
+
+import httpx
+import pytest
+from kubeagi_core.qa_provider.openai import QAProviderOpenAI
+from kubeagi_core.qa_provider.prompt import REFORMAT_PROMPT
+from kubeagi_core.qa_provider.rate_limit import RateLimiter
+from kubeagi_core.qa_provider.retry import QAProviderError, RetryPolicy
+
+
+class FakeStreamingLLM:
+    """Stream the answers in turn, an exception is raised before the stream."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    def stream(self, content):
+        self.prompts.append(content)
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        for index in range(0, len(answer), 5):
+            yield types.SimpleNamespace(content=answer[index : index + 5])
+
+
+class CountingRateLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__()
+        self.acquired = []
+
+    def acquire(self, tokens=0):
+        self.acquired.append(tokens)
+
+
+def _provider(answers, **kwargs):
+    provider = QAProviderOpenAI(
+        api_key="sk-test",
+        base_url="http://localhost:8000/v1",
+        model="test",
+        retry_policy=RetryPolicy(initial_wait_seconds=0, jitter=False),
+        **kwargs,
+    )
+    provider.llm = FakeStreamingLLM(answers)
+    return provider
+
+
+def test_stream_qa_pairs():
+    provider = _provider(["Q1: 问题一\nA1: 答案一\nQ2: 问题二\nA2: 答案二"])
+
+    pairs = list(provider.stream_qa_pairs("文本"))
+
+    assert pairs == [["问题一", "答案一"], ["问题二", "答案二"]]
+
+
+def test_stream_qa_pairs_is_rate_limited_and_retried():
+    limiter = CountingRateLimiter()
+    provider = _provider(
+        [httpx.ConnectError("refused"), "格式不对", "Q1: 问题\nA1: 答案"],
+        rate_limiter=limiter,
+    )
+
+    pairs = list(provider.stream_qa_pairs("文本"))
+
+    assert pairs == [["问题", "答案"]]
+    assert len(limiter.acquired) == 3
+    # the answer off the format is retried with the format prompt
+    assert not provider.llm.prompts[1].endswith(REFORMAT_PROMPT)
+    assert provider.llm.prompts[2].endswith(REFORMAT_PROMPT)
+
+
+def test_stream_qa_pairs_gives_up():
+    provider = _provider(["格式不对"] * 3)
+
+    with pytest.raises(QAProviderError):
+        list(provider.stream_qa_pairs("文本"))
+    assert len(provider.llm.prompts) == 3
+
+
+def test_stream_qa_pairs_rejects_invalid_template():
+    provider = _provider([])
+
+    with pytest.raises(ValueError):
+        list(provider.stream_qa_pairs("文本", prompt_template="{text} {other}"))
+    assert provider.llm.prompts == []
+
+
+def test_streamed_generation_stops_at_max_pairs():
+    answer = "".join(
+        f"Q{index}: 问题{index}\nA{index}: 答案{index}\n" for index in range(1, 9)
+    )
+    provider = _provider([answer], streaming=True, stream_max_pairs=2)
+
+    res = provider.generate_qa_list("文本")
+
+    assert res["status"] == 200
+    assert res["data"] == [["问题1", "答案1"], ["问题2", "答案2"]]
@@ -0,0 +1,175 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from kubeagi_core.document_transformers.document2csv import _pack_chunks
+from kubeagi_core.qa_provider.base import BaseQAProvider
+from kubeagi_core.qa_provider.parser import (
+    IncrementalQAParser,
+    pack_texts,
+    parse_packed_qa_lists,
+    parse_qa_list,
+)
+from kubeagi_core.qa_provider.retry import RetryPolicy
+
+# the second text is skipped, and the third marker is in full-width brackets
+PACKED_ANSWER = """[片段1]
+Q1: 问题一
+A1: 答案一
+Q2: 问题二
+A2: 答案二
+
+【片段3】
+Q1: 问题三
+A1: 答案三
+"""
+
+
+class FakeQAProvider(BaseQAProvider):
+    """Answer with the answers in turn."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.prompts = []
+        self.retry_policy = RetryPolicy(initial_wait_seconds=0, jitter=False)
+
+    def _complete(self, content):
+        self.prompts.append(content)
+        return self.answers.pop(0)
+
+
+def test_parse_qa_list():
+    text = "Q1: 问题一\nA1: 答案一\\n的后半\nQ2: 问题二\nA2: 答案二"
+
+    assert parse_qa_list(text) == [["问题一", "答案一的后半"], ["问题二", "答案二"]]
+    assert parse_qa_list("没有问题") == []
+
+
+def test_pack_texts():
+    assert pack_texts(["文本一", "文本二"]) == "[片段1]\n文本一\n\n[片段2]\n文本二"
+
+
+def test_parse_packed_qa_lists():
+    qa_lists = parse_packed_qa_lists(PACKED_ANSWER, 3)
+
+    assert qa_lists == [
+        [["问题一", "答案一"], ["问题二", "答案二"]],
+        # the model skipped the second text
+        [],
+        [["问题三", "答案三"]],
+    ]
+
+
+def test_parse_packed_qa_lists_drops_unknown_and_unmarked_pairs():
+    answer = "Q1: 无标记\nA1: 答案\n[片段9]\nQ1: 问题\nA1: 答案\n"
+
+    assert parse_packed_qa_lists(answer, 2) == [[], []]
+    # a single text does not need the marker
+    assert parse_packed_qa_lists("Q1: 问题\nA1: 答案", 1) == [[["问题", "答案"]]]
+
+
+def test_parse_packed_qa_lists_with_escaped_line_breaks():
+    answer = PACKED_ANSWER.replace("\n", "\\n")
+
+    assert parse_packed_qa_lists(answer, 3)[2] == [["问题三", "答案三"]]
+
+
+def test_generate_packed_qa_lists():
+    provider = FakeQAProvider(["格式不对", PACKED_ANSWER])
+
+    res = provider.generate_packed_qa_lists(["文本一", "文本二", "文本三"])
+
+    assert res["status"] == 200
+    assert [len(qa_list) for qa_list in res["data"]] == [2, 0, 1]
+    # the texts are packed into one prompt, and retried with the format prompt
+    assert len(provider.prompts) == 2
+    assert "[片段3]\n文本三" in provider.prompts[0]
+    assert provider.prompts[1].startswith(provider.prompts[0])
+
+
+def test_pack_chunks():
+    chunks = [(str(index), None, "x" * length) for index, length in enumerate([3] * 5)]
+
+    packs = list(_pack_chunks(chunks, max_chunks=2, max_chars=100))
+    assert [[chunk[0] for chunk in pack] for pack in packs] == [
+        ["0", "1"],
+        ["2", "3"],
+        ["4"],
+    ]
+
+    packs = list(_pack_chunks(chunks, max_chunks=10, max_chars=7))
+    assert [len(pack) for pack in packs] == [2, 2, 1]
+
+    # a chunk longer than max_chars is a pack on its own
+    packs = list(_pack_chunks([("0", None, "x" * 50)], max_chunks=10, max_chars=7))
+    assert len(packs) == 1
+
+
+def _feed(parser, text, size):
+    pairs = []
+    for index in range(0, len(text), size):
+        pairs.extend(parser.feed(text[index : index + size]))
+        if parser.done:
+            return pairs
+    return pairs + parser.close()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_incremental_parser_matches_parse_qa_list(size):
+    text = "前言\nQ1: 问题一\nA1: 答案一\\n的后半\nQ2: 问题二\nA2: 答案二\nQ3: 问题三\nA3: 答案三"
+
+    parser = IncrementalQAParser()
+
+    assert _feed(parser, text, size) == parse_qa_list(text)
+    assert parser.text == text
+    assert not parser.off_format
+
+
+def test_incremental_parser_waits_for_the_next_question():
+    parser = IncrementalQAParser()
+
+    assert parser.feed("Q1: 问题一\nA1: 答案") == []
+    # the answer may go on in the next chunk
+    assert parser.feed("一\n") == []
+    assert parser.feed("Q2: 问题二\nA2: 答案二") == [["问题一", "答案一"]]
+    assert parser.close() == [["问题二", "答案二"]]
+
+
+def test_incremental_parser_stops_at_max_pairs():
+    text = "Q1: 问题一\nA1: 答案一\nQ2: 问题二\nA2: 答案二\nQ3: 问题三\nA3: 答案三"
+    parser = IncrementalQAParser(max_pairs=2)
+
+    pairs = _feed(parser, text, 4)
+
+    assert pairs == [["问题一", "答案一"], ["问题二", "答案二"]]
+    assert parser.done
+    assert parser.text == "Q1: 问题一\nA1: 答案一\nQ2: 问题二\nA2: 答案二\n"
+    assert parse_qa_list(parser.text) == pairs
+
+
+def test_incremental_parser_does_not_cap_packed_answers():
+    parser = IncrementalQAParser(max_pairs=1)
+
+    pairs = _feed(parser, PACKED_ANSWER, 4)
+
+    assert len(pairs) == 3
+    assert parse_packed_qa_lists(parser.text, 3)[2] == [["问题三", "答案三"]]
+
+
+def test_incremental_parser_stops_off_format_answer():
+    parser = IncrementalQAParser(max_preamble_chars=20)
+
+    assert _feed(parser, "这个回答没有按照格式给出任何问题和答案，" * 10, 5) == []
+    assert parser.done
+    assert parser.off_format
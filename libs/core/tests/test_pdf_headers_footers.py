@@ -0,0 +1,49 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from kubeagi_core.document_loaders.pdf import _edge_line_keys, strip_headers_footers
+from langchain_core.documents import Document
+
+BODIES = [
+    "The quarterly revenue grew by a tenth compared with last year.",
+    "Operating costs were reduced across all the regional offices.",
+    "The board approved the new dividend policy in its March meeting.",
+    "Research spending doubled to support the new product lines.",
+    "Customer retention improved thanks to the loyalty programme.",
+]
+
+
+def test_strip_headers_footers():
+    documents = [
+        Document(page_content=f"Annual Report\n{body}\n{body.upper()}\nPage {page}")
+        for page, body in enumerate(BODIES, start=1)
+    ]
+
+    strip_headers_footers(documents, max_lines=3)
+
+    for document, body in zip(documents, BODIES):
+        assert document.page_content == f"{body}\n{body.upper()}"
+
+
+def test_edge_windows_do_not_overlap():
+    lines = ["Annual Report", BODIES[0], BODIES[1], "Page 1"]
+
+    keys = list(_edge_line_keys(lines, max_lines=3))
+
+    indexes = [index for index, _ in keys]
+    assert len(indexes) == len(set(indexes))
+    top = {index for index, (position, _) in keys if position >= 0}
+    bottom = {index for index, (position, _) in keys if position < 0}
+    assert top == {0, 1}
+    assert bottom == {2, 3}
@@ -0,0 +1,126 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from kubeagi_core.qa_provider import rate_limit
+from kubeagi_core.qa_provider.base import BaseQAProvider
+from kubeagi_core.qa_provider.rate_limit import (
+    RateLimiter,
+    SQLiteRateLimiter,
+    estimate_tokens,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "time", clock.time)
+    return clock
+
+
+class FakeQAProvider(BaseQAProvider):
+    def __init__(self, rate_limiter):
+        self.rate_limiter = rate_limiter
+        self.completion_tokens = 100
+
+    def _complete(self, content):
+        return "Q1: 问题\nA1: 答案"
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("中文") == 2
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("中文abcd") == 3
+
+
+def test_no_limit():
+    assert RateLimiter.from_config({}) is None
+    assert RateLimiter().reserve(10**6) == 0.0
+
+
+def test_requests_per_minute(clock):
+    limiter = RateLimiter(requests_per_minute=60)
+
+    # the bucket holds one minute of requests
+    assert [limiter.reserve() for _ in range(60)] == [0.0] * 60
+    # then a request per second, the waiting ones take their turns
+    assert limiter.reserve() == pytest.approx(1.0)
+    assert limiter.reserve() == pytest.approx(2.0)
+    clock.now += 10
+    assert limiter.reserve() == pytest.approx(0.0)
+    assert limiter.stats()["waits"] == 2
+
+
+def test_tokens_per_minute(clock):
+    limiter = RateLimiter(tokens_per_minute=600)
+
+    assert limiter.reserve(500) == 0.0
+    # 400 tokens short, at 10 tokens per second
+    assert limiter.reserve(500) == pytest.approx(40.0)
+    # an invocation larger than the bucket waits for a full bucket only
+    clock.now += 100
+    assert limiter.reserve(10**6) == pytest.approx(0.0)
+
+
+def test_provider_waits_for_the_limiter(clock, monkeypatch):
+    waits = []
+    monkeypatch.setattr(rate_limit.time, "sleep", waits.append)
+    provider = FakeQAProvider(RateLimiter(tokens_per_minute=120))
+
+    assert provider.generate_qa_list("文本")["status"] == 200
+    assert waits == []
+    assert provider.generate_qa_list("文本")["status"] == 200
+    # the prompt and the completion tokens of both invocations
+    assert len(waits) == 1
+    assert waits[0] > 0
+
+
+def test_sqlite_limiter_is_shared_between_instances(tmp_path, clock):
+    path = str(tmp_path / "rate_limit.db")
+    first = SQLiteRateLimiter(path, requests_per_minute=2)
+    second = SQLiteRateLimiter(path, requests_per_minute=2)
+
+    assert first.reserve() == 0.0
+    assert second.reserve() == 0.0
+    # the bucket is empty for both of them
+    assert first.reserve() == pytest.approx(30.0)
+    assert second.reserve() == pytest.approx(60.0)
+
+
+def test_sqlite_limiter_buckets_are_per_limit(tmp_path, clock):
+    path = str(tmp_path / "rate_limit.db")
+    slow = SQLiteRateLimiter(path, requests_per_minute=1)
+    fast = SQLiteRateLimiter(path, requests_per_minute=60)
+
+    assert slow.reserve() == 0.0
+    assert fast.reserve() == 0.0
+
+
+def test_from_config(tmp_path):
+    limiter = RateLimiter.from_config({"rate_limit_rpm": 60})
+    assert type(limiter) is RateLimiter
+
+    limiter = RateLimiter.from_config(
+        {"rate_limit_tpm": 1000, "rate_limit_path": str(tmp_path / "limits.db")}
+    )
+    assert isinstance(limiter, SQLiteRateLimiter)
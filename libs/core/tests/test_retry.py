@@ -0,0 +1,142 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import httpx
+import pytest
+from kubeagi_core.qa_provider.base import BaseQAProvider
+from kubeagi_core.qa_provider.retry import (
+    QAFormatError,
+    QAProviderError,
+    RetryPolicy,
+    is_retryable,
+)
+from kubeagi_core.qa_provider.zhipuai import QAProviderZhiPuAIOnline
+
+ANSWER = "Q1: 什么是大语言模型？\nA1: 使用大量文本数据训练的深度学习模型。"
+
+
+class FakeQAProvider(BaseQAProvider):
+    """Answer with the outcomes in turn, an exception is raised."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.prompts = []
+        self.retry_policy = RetryPolicy(initial_wait_seconds=0, jitter=False)
+
+    def _complete(self, content):
+        self.prompts.append(content)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def _http_error(status_code, headers=None):
+    request = httpx.Request("POST", "http://model")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+@pytest.mark.parametrize(
+    "error, retryable",
+    [
+        (QAFormatError("malformed"), True),
+        (QAProviderError("并发数过高", status_code=429), True),
+        (QAProviderError("api key 无效"), False),
+        (_http_error(429), True),
+        (_http_error(503), True),
+        (_http_error(401), False),
+        (httpx.ConnectError("refused"), True),
+        (TimeoutError(), True),
+        (KeyError("choices"), False),
+    ],
+)
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_retry_state_backoff_and_retry_after():
+    policy = RetryPolicy(
+        max_attempts=4, initial_wait_seconds=1, multiplier=2, jitter=False
+    )
+    retry = policy.start()
+
+    assert retry.next_wait(_http_error(503)) == 1
+    assert retry.next_wait(_http_error(429, {"retry-after": "7"})) == 7
+    assert retry.next_wait(_http_error(503)) == 4
+    # the last attempt
+    assert retry.next_wait(_http_error(503)) is None
+    assert retry.attempts == 4
+
+
+def test_retry_state_gives_up_on_fatal_error():
+    retry = RetryPolicy().start()
+
+    assert retry.next_wait(_http_error(401)) is None
+    assert retry.attempts == 1
+
+
+def test_format_error_retried_with_reformat_prompt():
+    provider = FakeQAProvider(["no pairs", ANSWER])
+
+    result = provider.generate_qa_list("text")
+
+    assert result["status"] == 200
+    assert len(result["data"]) == 1
+    assert len(provider.prompts) == 2
+    assert provider.prompts[1].startswith(provider.prompts[0])
+    assert len(provider.prompts[1]) > len(provider.prompts[0])
+
+
+def test_fatal_error_not_retried():
+    provider = FakeQAProvider([QAProviderError("模型调用失败，失败原因: api key 无效")])
+
+    result = provider.generate_qa_list("text")
+
+    assert result == {
+        "status": 1000,
+        "message": "模型调用失败，失败原因: api key 无效",
+        "data": [],
+    }
+    assert len(provider.prompts) == 1
+
+
+def test_zhipuai_rate_limit_in_body_is_retried():
+    provider = QAProviderZhiPuAIOnline(api_key="id.secret", model="chatglm_turbo")
+    provider.retry_policy = RetryPolicy(initial_wait_seconds=0, jitter=False)
+    responses = [
+        {"code": 1302, "msg": "您当前使用该API的并发数过高", "success": False},
+        {"code": 200, "success": True, "data": {"choices": [{"content": ANSWER}]}},
+    ]
+    provider._invoke = lambda content: responses.pop(0)
+
+    result = provider.generate_qa_list("text")
+
+    assert result["status"] == 200
+    assert len(result["data"]) == 1
+    assert responses == []
+
+
+def test_zhipuai_other_error_in_body_is_not_retried():
+    provider = QAProviderZhiPuAIOnline(api_key="id.secret", model="chatglm_turbo")
+    responses = [
+        {"code": 1002, "msg": "Authorization Token非法", "success": False},
+        {"code": 200, "success": True, "data": {"choices": [{"content": ANSWER}]}},
+    ]
+    provider._invoke = lambda content: responses.pop(0)
+
+    result = provider.generate_qa_list("text")
+
+    assert result["status"] == 1000
+    assert len(responses) == 1
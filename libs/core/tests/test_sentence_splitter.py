@@ -0,0 +1,80 @@
+# Copyright 2024 KubeAGI.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from kubeagi_core.document_chunks.sentence_splitter import CJKSentenceSplitter
+from kubeagi_core.document_chunks.tokenizer import Tokenizer, token_length_function
+from langchain_core.documents import Document
+
+
+class ByteTokenizer(Tokenizer):
+    """One token per UTF-8 byte, a CJK character is three tokens."""
+
+    def encode(self, text):
+        return list(text.encode("utf-8"))
+
+
+TEXT = (
+    "大语言模型（LLM）是指使用大量文本数据训练的深度学习模型，"
+    "可以生成自然语言文本或理解语言文本的含义。"
+    # a long sentence without any clause punctuation
+    + "没有标点的长句子" * 30 + "。它真的有用吗？“当然。”他回答道。\n\n"
+)
+
+
+def test_chunks_within_token_budget():
+    tokenizer = ByteTokenizer()
+    length_function = token_length_function(tokenizer)
+    splitter = CJKSentenceSplitter(chunk_size=50, chunk_overlap=0, tokenizer=tokenizer)
+
+    chunks = splitter.split_documents([Document(page_content=TEXT * 3)])
+
+    assert chunks
+    for chunk in chunks:
+        assert length_function(chunk.page_content) <= 50
+    # the over-long sentence is cut, not dropped
+    assert "".join(chunk.page_content for chunk in chunks).count("没有标点") == 90
+
+
+def test_chunks_within_character_budget():
+    splitter = CJKSentenceSplitter(chunk_size=50, chunk_overlap=10)
+
+    chunks = splitter.split_documents([Document(page_content=TEXT)])
+
+    assert all(len(chunk.page_content) <= 50 for chunk in chunks)
+
+
+def test_cut_measures_bounded_prefixes():
+    tokenizer = ByteTokenizer()
+    measured = []
+
+    def length_function(text):
+        measured.append(len(text))
+        return len(tokenizer.encode(text))
+
+    splitter = CJKSentenceSplitter(
+        chunk_size=50, chunk_overlap=0, length_function=length_function
+    )
+    # a long text without any punctuation
+    text = "没有标点的长句子" * 2000
+
+    chunks = [
+        chunk.page_content
+        for chunk in splitter.split_documents([Document(page_content=text)])
+    ]
+
+    assert "".join(chunks) == text
+    assert all(len(tokenizer.encode(chunk)) <= 50 for chunk in chunks)
+    # the prefixes are measured within a window, not over the remaining text,
+    # only the whole sentence and its clause are measured to see if they fit
+    assert [length for length in measured if length > 100] == [len(text)] * 2